@@ -5,11 +5,14 @@ Version 2.0.0 - Two-agent architecture
 - V2 endpoints: New multi-agent router (via intent agent)
 """
 
-import uuid
-from fastapi import FastAPI, HTTPException, Request
+from contextlib import contextmanager
+
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from datetime import datetime
+from fastapi.responses import ORJSONResponse, Response
+import orjson
 
+from app.api.middleware import TraceIDMiddleware
 from app.api.models import (
     ChatRequestV1,
     ChatRequestV2,
@@ -18,8 +21,11 @@ from app.api.models import (
 )
 from app.core.agents.intent.agent import IntentAgent
 from app.core.agents.pollution.agent import PollutionAgent
-from app.core.shared.messaging import AgentMessage
-from app.infrastructure.logging_config import setup_logging, set_trace_id, get_trace_id, get_logger
+from app.core.agents.pollution.tools import prewarm_policies
+from app.infrastructure.logging_config import setup_logging, get_trace_id, get_correlation_id, get_logger
+
+# Shared default for requests without conversation history
+_EMPTY_HISTORY: tuple[dict, ...] = ()
 
 # Setup logging
 setup_logging()
@@ -30,15 +36,19 @@ pollution_agent = PollutionAgent()
 intent_agent = IntentAgent()
 intent_agent.register_agent(pollution_agent)
 
+# Load zone policies before the first request needs them
+logger.info("Prewarmed %d zone policies", prewarm_policies())
+
 logger.info("Agent system initialized:")
-logger.info(f"  - {pollution_agent.name}: Domain expert for pollution zones")
-logger.info(f"  - {intent_agent.name}: Router with {len(intent_agent.agents)} registered agents")
+logger.info("  - %s: Domain expert for pollution zones", pollution_agent.name)
+logger.info("  - %s: Router with %d registered agents", intent_agent.name, len(intent_agent.agents))
 
 # Create FastAPI app
 app = FastAPI(
     title="Agent Orchestrator",
     description="Car pollution zone eligibility service - Multi-agent architecture",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -50,21 +60,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Assign a trace_id to every request (outermost, so CORS responses carry it too);
+# health probes skip it
+app.add_middleware(TraceIDMiddleware, skip_paths=("/health",))
 
-@app.middleware("http")
-async def trace_id_middleware(request: Request, call_next):
-    """Add trace_id to all requests for traceability."""
-    trace_id = str(uuid.uuid4())
-    set_trace_id(trace_id)
-    
-    logger.info(f"[{trace_id}] Incoming: {request.method} {request.url.path}")
-    
-    response = await call_next(request)
-    response.headers["X-Trace-ID"] = trace_id
-    
-    logger.info(f"[{trace_id}] Completed: {response.status_code}")
-    
-    return response
+# Agents are fixed after startup, so the health body is serialized once
+_HEALTH_BODY = orjson.dumps(HealthResponse(
+    status="healthy",
+    version="2.0.0",
+    agents=intent_agent.agent_names
+).model_dump())
 
 
 @app.get("/health", response_model=HealthResponse, tags=["System"])
@@ -74,12 +79,55 @@ async def health_check():
     
     Returns service status, version, and registered agents.
     """
-    logger.debug("Health check requested")
-    return HealthResponse(
-        status="healthy",
-        version="2.0.0",
-        agents=intent_agent.list_agents()
-    )
+    return Response(_HEALTH_BODY, media_type="application/json")
+
+
+@contextmanager
+def _server_errors(trace_id: str, endpoint: str):
+    """
+    Turn unexpected errors in a chat endpoint into a 500 HTTPException.
+    
+    Raised inside the app, so the response still passes through
+    CORSMiddleware and TraceIDMiddleware and carries their headers.
+    """
+    try:
+        yield
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("[%s] %s Error: %s", trace_id, endpoint, e, exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing request: {str(e)}"
+        ) from e
+
+
+# Set once the legacy /chat deprecation warning has been logged
+_legacy_warned = False
+
+
+async def _run_v1(request: ChatRequestV1) -> ChatResponse:
+    """Shared V1 handler used by /v1/chat and the legacy /chat endpoint."""
+    trace_id = get_trace_id()
+    correlation_id = get_correlation_id()
+    
+    logger.debug("[%s] V1 Chat: %.80s...", trace_id, request.message)
+    
+    with _server_errors(trace_id, "V1"):
+        # Route directly to pollution agent (bypass intent router);
+        # trace/correlation IDs come from the request ContextVars
+        payload = await pollution_agent.handle_raw(
+            query=request.message,
+            conversation_history=request.conversation_history or _EMPTY_HISTORY
+        )
+        
+        logger.debug("[%s] V1 Response generated", trace_id)
+        
+        return ChatResponse(
+            reply=payload["answer"],
+            trace_id=trace_id,
+            correlation_id=correlation_id
+        )
 
 
 @app.post("/v1/chat", response_model=ChatResponse, tags=["v1"])
@@ -101,41 +149,7 @@ async def chat_v1(request: ChatRequestV1):
     Returns:
         ChatResponse with reply, trace_id, and correlation_id
     """
-    trace_id = get_trace_id() or str(uuid.uuid4())
-    correlation_id = str(uuid.uuid4())
-    
-    logger.info(f"[{trace_id}] V1 Chat: {request.message[:80]}...")
-    
-    try:
-        # Create message for pollution agent (bypass intent router)
-        message = AgentMessage(
-            trace_id=trace_id,
-            correlation_id=correlation_id,
-            sender="api_v1",
-            receiver="pollution_agent",
-            payload={"message": request.message},
-            conversation_history=request.conversation_history or [],
-            context={},
-            timestamp=datetime.now()
-        )
-        
-        # Route directly to pollution agent
-        response = await pollution_agent.handle(message)
-        
-        logger.info(f"[{trace_id}] V1 Response generated")
-        
-        return ChatResponse(
-            reply=response.payload["answer"],
-            trace_id=trace_id,
-            correlation_id=correlation_id
-        )
-        
-    except Exception as e:
-        logger.error(f"[{trace_id}] V1 Error: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error processing request: {str(e)}"
-        )
+    return await _run_v1(request)
 
 
 @app.post("/v2/chat", response_model=ChatResponse, tags=["v2"])
@@ -158,28 +172,19 @@ async def chat_v2(request: ChatRequestV2):
     Returns:
         ChatResponse with reply, trace_id, and correlation_id
     """
-    trace_id = get_trace_id() or str(uuid.uuid4())
-    correlation_id = str(uuid.uuid4())
+    trace_id = get_trace_id()
+    correlation_id = get_correlation_id()
     
-    logger.info(f"[{trace_id}] V2 Chat: {request.message[:80]}...")
+    logger.debug("[%s] V2 Chat: %.80s...", trace_id, request.message)
     
-    try:
+    with _server_errors(trace_id, "V2"):
         # Route via intent agent (multi-domain ready)
-        response_message = await intent_agent.handle(AgentMessage(
-            trace_id=trace_id,
-            correlation_id=correlation_id,
-            sender="api_v2",
-            receiver="intent_agent",
-            payload={
-                "message": request.message,
-                "conversation_history": request.conversation_history or []
-            },
-            conversation_history=request.conversation_history or [],
-            context={},
-            timestamp=datetime.now()
-        ))
+        response_message = await intent_agent.route({
+            "message": request.message,
+            "conversation_history": request.conversation_history or _EMPTY_HISTORY
+        })
         
-        logger.info(f"[{trace_id}] V2 Response generated")
+        logger.debug("[%s] V2 Response generated", trace_id)
         
         # Extract fields from response
         answer = response_message.payload.get("answer", "No response")
@@ -193,13 +198,6 @@ async def chat_v2(request: ChatRequestV2):
             pending_question=pending_question,
             options=options
         )
-        
-    except Exception as e:
-        logger.error(f"[{trace_id}] V2 Error: {str(e)}", exc_info=True)
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error processing request: {str(e)}"
-        )
 
 
 # For backward compatibility during transition
@@ -213,10 +211,14 @@ async def chat_legacy(request: ChatRequestV1):
     
     **Deprecated**: Use /v1/chat or /v2/chat instead.
     """
-    logger.warning("Legacy /chat endpoint used - recommend migrating to /v1/chat or /v2/chat")
-    return await chat_v1(request)
+    global _legacy_warned
+    if not _legacy_warned:
+        _legacy_warned = True
+        logger.warning("Legacy /chat endpoint used - recommend migrating to /v1/chat or /v2/chat")
+    return await _run_v1(request)
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # TraceIDMiddleware already logs every request, so uvicorn's access log is off
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop="uvloop", http="httptools", access_log=False)
@@ -1 +1,5 @@
 """API middleware for tracing, error handling, etc."""
+
+from .tracing import TraceIDMiddleware, new_id
+
+__all__ = ['TraceIDMiddleware', 'new_id']
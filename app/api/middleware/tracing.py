@@ -0,0 +1,63 @@
+"""Pure ASGI middleware that assigns trace/correlation IDs to every HTTP request."""
+
+from time import perf_counter_ns
+
+from app.infrastructure.logging_config import set_trace_id, set_correlation_id, get_logger, new_trace_id
+
+logger = get_logger(__name__)
+
+
+def new_id() -> str:
+    """Return a time-sortable 128-bit hex identifier for trace/correlation IDs."""
+    return new_trace_id()
+
+
+class TraceIDMiddleware:
+    """
+    Add trace_id to all requests for traceability.
+
+    Implemented as plain ASGI rather than ``@app.middleware("http")`` so the
+    request is not wrapped in BaseHTTPMiddleware's extra task and
+    Request/Response objects, and the trace_id ContextVar stays visible to
+    the endpoint. A correlation_id is generated here too, so agents read
+    both from the ContextVars instead of having them passed in. The
+    trace_id is returned to the client as ``X-Trace-ID``.
+
+    Each request is logged once, on completion, with method, path, status
+    and duration; per-step logs elsewhere are DEBUG. Requests for
+    ``skip_paths`` (e.g. load-balancer health probes) are passed through
+    untouched.
+    """
+
+    def __init__(self, app, skip_paths=()):
+        self.app = app
+        self.skip_paths = frozenset(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        start = perf_counter_ns()
+        trace_id = new_id()
+        set_trace_id(trace_id)
+        set_correlation_id(new_id())
+        trace_header = (b"x-trace-id", trace_id.encode())
+        status = 500  # unless a response is started
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append(trace_header)
+                message["headers"] = headers
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            logger.info(
+                "[%s] %s %s %d %.2fms", trace_id, scope["method"], scope["path"],
+                status, (perf_counter_ns() - start) / 1e6
+            )
@@ -1,8 +1,14 @@
 """API request/response models for versioned endpoints."""
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List, Dict
 
+# Shared config: immutable, reject unknown fields
+API_MODEL_CONFIG = ConfigDict(frozen=True, extra='forbid')
+
+# Longest user message accepted by the chat endpoints (responses are unbounded)
+MAX_MESSAGE_LENGTH = 8192
+
 
 class ChatRequestV1(BaseModel):
     """
@@ -12,8 +18,11 @@ class ChatRequestV1(BaseModel):
     without intent classification.
     """
     
-    message: str = Field(..., description="User query")
-    conversation_history: Optional[List[Dict[str, str]]] = Field(
+    # Legacy clients (/chat) still send session_id, so extras are ignored
+    model_config = ConfigDict(frozen=True, extra='ignore')
+    
+    message: str = Field(..., max_length=MAX_MESSAGE_LENGTH, description="User query")
+    conversation_history: Optional[tuple[Dict[str, str], ...]] = Field(
         default=None,
         description="Previous chat messages for context"
     )
@@ -27,8 +36,10 @@ class ChatRequestV2(BaseModel):
     Prepares for multi-domain expansion.
     """
     
-    message: str = Field(..., description="User query")
-    conversation_history: Optional[List[Dict[str, str]]] = Field(
+    model_config = API_MODEL_CONFIG
+    
+    message: str = Field(..., max_length=MAX_MESSAGE_LENGTH, description="User query")
+    conversation_history: Optional[tuple[Dict[str, str], ...]] = Field(
         default=None,
         description="Previous chat messages for context"
     )
@@ -45,6 +56,8 @@ class ChatResponse(BaseModel):
     Contains the assistant's response plus tracing information.
     """
     
+    model_config = API_MODEL_CONFIG
+    
     reply: str = Field(..., description="Assistant response")
     trace_id: str = Field(..., description="Unique request ID for debugging")
     correlation_id: str = Field(..., description="Links related requests")
@@ -60,6 +73,8 @@ class ChatResponse(BaseModel):
 class HealthResponse(BaseModel):
     """Health check response."""
     
+    model_config = API_MODEL_CONFIG
+    
     status: str = Field(..., description="Service status")
     version: str = Field(..., description="API version")
-    agents: List[str] = Field(..., description="Registered agents")
+    agents: tuple[str, ...] = Field(..., description="Registered agents")
@@ -12,9 +12,14 @@ Current: Single domain (pollution) - simple routing.
 
 from app.core.agents.base import BaseAgent
 from app.core.shared.messaging import AgentMessage
-from datetime import datetime
-from typing import Dict, Optional
-import uuid
+from app.infrastructure.logging_config import get_logger, get_trace_id, get_correlation_id
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Sequence
+
+logger = get_logger(__name__)
+
+# Shared default for requests without conversation history
+_EMPTY_HISTORY: tuple[dict, ...] = ()
 
 
 class IntentAgent(BaseAgent):
@@ -37,7 +42,20 @@ class IntentAgent(BaseAgent):
     
     def __init__(self):
         """Initialize intent agent with empty registry."""
-        self.agents: Dict[str, BaseAgent] = {}
+        self._agents: Dict[str, BaseAgent] = {}
+        # Read-only view and name tuple, kept in sync by (un)register_agent
+        self._agents_view: Mapping[str, BaseAgent] = MappingProxyType(self._agents)
+        self._agent_names: tuple[str, ...] = ()
+    
+    @property
+    def agents(self) -> Mapping[str, BaseAgent]:
+        """Read-only view of the agent registry (name -> agent)."""
+        return self._agents_view
+    
+    @property
+    def agent_names(self) -> tuple[str, ...]:
+        """Names of registered agents, in registration order."""
+        return self._agent_names
     
     def register_agent(self, agent: BaseAgent) -> None:
         """
@@ -49,11 +67,12 @@ class IntentAgent(BaseAgent):
         Raises:
             ValueError: If agent name already registered
         """
-        if agent.name in self.agents:
+        if agent.name in self._agents:
             raise ValueError(f"Agent '{agent.name}' already registered")
         
-        self.agents[agent.name] = agent
-        print(f"[IntentAgent] Registered: {agent.name}")
+        self._agents[agent.name] = agent
+        self._agent_names = tuple(self._agents)
+        logger.debug("Registered agent: %s", agent.name)
     
     def unregister_agent(self, agent_name: str) -> None:
         """
@@ -62,18 +81,19 @@ class IntentAgent(BaseAgent):
         Args:
             agent_name: Name of agent to remove
         """
-        if agent_name in self.agents:
-            del self.agents[agent_name]
-            print(f"[IntentAgent] Unregistered: {agent_name}")
+        if agent_name in self._agents:
+            del self._agents[agent_name]
+            self._agent_names = tuple(self._agents)
+            logger.debug("Unregistered agent: %s", agent_name)
     
     def list_agents(self) -> list[str]:
         """Return list of registered agent names."""
-        return list(self.agents.keys())
+        return list(self._agent_names)
     
     async def route(
         self,
         request_payload: dict,
-        trace_id: str,
+        trace_id: Optional[str] = None,
         correlation_id: Optional[str] = None
     ) -> AgentMessage:
         """
@@ -89,8 +109,10 @@ class IntentAgent(BaseAgent):
             request_payload: Request data including:
                 - message: User query
                 - conversation_history: Previous messages (optional)
-            trace_id: Unique ID for tracing
-            correlation_id: Optional correlation ID (defaults to trace_id)
+            trace_id: Unique ID for tracing (defaults to the request's
+                trace_id ContextVar)
+            correlation_id: Optional correlation ID (defaults to the
+                correlation_id ContextVar, then to trace_id)
             
         Returns:
             AgentMessage from domain agent with full response data
@@ -99,52 +121,89 @@ class IntentAgent(BaseAgent):
             ValueError: If no agent can handle the request
         """
         
-        # Default correlation_id to trace_id if not provided
+        # IDs are normally set per request by TraceIDMiddleware
+        if trace_id is None:
+            trace_id = get_trace_id()
         if correlation_id is None:
-            correlation_id = trace_id
+            correlation_id = get_correlation_id() or trace_id
         
         # 1. Classify intent
         intent = self._classify_intent(request_payload.get("message", ""))
         
         # 2. Get target agent
-        agent = self.agents.get(intent)
+        agent = self._agents.get(intent)
         if not agent:
-            available = ", ".join(self.agents.keys()) if self.agents else "none"
+            available = ", ".join(self._agent_names) or "none"
             error_msg = (
                 f"Sorry, I don't know how to help with that yet. "
                 f"I can help with: {available}"
             )
             # Return error as AgentMessage
             return AgentMessage(
-                trace_id=trace_id,
-                correlation_id=correlation_id or trace_id,
-                sender=self.name,
-                receiver="unknown",
-                payload={"answer": error_msg},
-                conversation_history=request_payload.get("conversation_history", []),
-                context={},
-                timestamp=datetime.now()
+                trace_id, correlation_id or trace_id, self.name, "unknown",
+                {"answer": error_msg}, {},
+                request_payload.get("conversation_history", _EMPTY_HISTORY)
+            )
+        
+        conversation_history = request_payload.get("conversation_history", _EMPTY_HISTORY)
+        
+        # Fast path: a single registered agent is called directly
+        if len(self._agent_names) == 1:
+            return await self._direct_call(
+                agent, request_payload, conversation_history, trace_id, correlation_id
             )
         
         # 3. Create agent message
         message = AgentMessage(
-            trace_id=trace_id,
-            correlation_id=correlation_id,
-            sender=self.name,
-            receiver=intent,
-            payload=request_payload,
-            conversation_history=request_payload.get("conversation_history", []),
-            context={},
-            timestamp=datetime.now()
+            trace_id, correlation_id, self.name, intent,
+            request_payload, {}, conversation_history
         )
         
         # 4. Route to agent
-        print(f"[{trace_id}] IntentAgent routing to: {intent}")
+        logger.debug("[%s] IntentAgent routing to: %s", trace_id, intent)
         response = await agent.handle(message)
         
         # 5. Return full response (preserves disambiguation data)
         return response
     
+    async def _direct_call(
+        self,
+        agent: BaseAgent,
+        request_payload: dict,
+        conversation_history: Sequence[Mapping[str, str]],
+        trace_id: str,
+        correlation_id: str
+    ) -> AgentMessage:
+        """
+        Call an agent without building an intermediate request AgentMessage.
+        
+        Agents exposing handle_raw() are invoked with the raw request fields
+        and only the reply message is constructed; other agents fall back to
+        the regular handle() protocol.
+        
+        Returns:
+            AgentMessage reply from the agent (sender=agent, receiver=router)
+        """
+        logger.debug("[%s] IntentAgent direct call: %s", trace_id, agent.name)
+        
+        handle_raw = getattr(agent, "handle_raw", None)
+        if handle_raw is None:
+            return await agent.handle(AgentMessage(
+                trace_id, correlation_id, self.name, agent.name,
+                request_payload, {}, conversation_history
+            ))
+        
+        payload = await handle_raw(
+            query=request_payload.get("message", ""),
+            conversation_history=conversation_history,
+            trace_id=trace_id,
+            correlation_id=correlation_id
+        )
+        return AgentMessage(
+            trace_id, correlation_id, agent.name, self.name,
+            payload, {}, conversation_history
+        )
+    
     async def handle(self, message: AgentMessage) -> AgentMessage:
         """
         Handle incoming message (alternate interface for agent-to-agent calls).
@@ -210,5 +269,5 @@ class IntentAgent(BaseAgent):
         #     return "pollution_agent"  # default
     
     def __repr__(self) -> str:
-        agent_count = len(self.agents)
+        agent_count = len(self._agent_names)
         return f"<IntentAgent(agents={agent_count})>"
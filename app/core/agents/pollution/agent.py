@@ -10,9 +10,9 @@ eligibility checks. It acts as a domain expert that:
 
 from app.core.agents.base import BaseAgent
 from app.core.shared.messaging import AgentMessage
+from app.infrastructure.logging_config import get_trace_id, get_correlation_id
 from .graph import get_graph
-from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, Mapping, Optional, Sequence
 
 
 class PollutionAgent(BaseAgent):
@@ -30,6 +30,16 @@ class PollutionAgent(BaseAgent):
     
     name = "pollution_agent"
     
+    # Compiled workflow shared by all instances (built on first use)
+    _graph = None
+    
+    @classmethod
+    def _get_graph(cls):
+        """Return the shared compiled LangGraph, building it once."""
+        if cls._graph is None:
+            cls._graph = get_graph()
+        return cls._graph
+    
     def __init__(self, cache: Optional[dict] = None):
         """
         Initialize pollution agent with optional cache.
@@ -37,7 +47,7 @@ class PollutionAgent(BaseAgent):
         Args:
             cache: Optional cache for policies (future enhancement)
         """
-        self.graph = get_graph()
+        self.graph = self._get_graph()
         self.cache = cache or {}
     
     async def handle(self, message: AgentMessage) -> AgentMessage:
@@ -68,22 +78,57 @@ class PollutionAgent(BaseAgent):
             Exception: If LangGraph execution fails (includes trace_id)
         """
         
-        # Extract from message
-        query = message.payload.get("message", "")
-        conversation_history = message.conversation_history
+        payload = await self.handle_raw(
+            query=message.payload.get("message", ""),
+            conversation_history=message.conversation_history,
+            trace_id=message.trace_id,
+            correlation_id=message.correlation_id
+        )
+        return message.create_reply(payload=payload, context=message.context)
+    
+    async def handle_raw(
+        self,
+        query: str,
+        conversation_history: Sequence[Mapping[str, str]],
+        trace_id: Optional[str] = None,
+        correlation_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Run the LangGraph workflow directly and return the response payload.
+        
+        Used by handle() and by routers that can skip building an
+        intermediate AgentMessage for the request.
+        
+        Args:
+            query: User query
+            conversation_history: Previous chat messages
+            trace_id: For debugging/monitoring (defaults to the trace_id
+                ContextVar)
+            correlation_id: Used as the graph session_id (defaults to the
+                correlation_id ContextVar, then to trace_id)
+            
+        Returns:
+            Response payload with "answer" and, when available, "decision",
+            "pending_question" and "options" (or "error" on failure)
+        """
+        
+        if trace_id is None:
+            trace_id = get_trace_id()
+        if correlation_id is None:
+            correlation_id = get_correlation_id() or trace_id
         
         # Use existing LangGraph workflow (NO CHANGES to graph logic)
         # The graph expects:
         # - message: User query
-        # - conversation_history: List of previous messages
+        # - conversation_history: Sequence of previous messages
         # - trace_id: For logging
         # - session_id: Required by AgentState (use correlation_id)
         try:
             result = await self.graph.ainvoke({
                 "message": query,
                 "conversation_history": conversation_history,
-                "trace_id": message.trace_id,
-                "session_id": message.correlation_id  # Use correlation_id as session
+                "trace_id": trace_id,
+                "session_id": correlation_id  # Use correlation_id as session
             })
             
             # Extract answer from graph result
@@ -104,24 +149,18 @@ class PollutionAgent(BaseAgent):
             if "disambiguation_options" in result:
                 response_payload["options"] = result["disambiguation_options"]
             
-            # Return response message using helper
-            return message.create_reply(
-                payload=response_payload,
-                context=message.context
-            )
+            return response_payload
             
         except Exception as e:
             # Log error with trace_id for debugging
-            error_msg = f"[{message.trace_id}] PollutionAgent error: {str(e)}"
+            error_msg = f"[{trace_id}] PollutionAgent error: {str(e)}"
             print(error_msg)  # Will be captured by logging system
             
             # Return error response
-            return message.create_reply(
-                payload={
-                    "answer": "Sorry, I encountered an error processing your request. Please try again.",
-                    "error": str(e)
-                }
-            )
+            return {
+                "answer": "Sorry, I encountered an error processing your request. Please try again.",
+                "error": str(e)
+            }
     
     def __repr__(self) -> str:
         return f"<PollutionAgent(name='{self.name}')>"
@@ -1,16 +1,38 @@
 """LangGraph workflow for agent orchestration."""
+import logging
+import threading
 import time
-from typing import Literal
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar, copy_context
+from typing import Callable, Literal, Optional
 from langgraph.graph import StateGraph, END
 from app.core.shared.models import AgentState, FleetDecision
 from app.core.shared.llm import get_llm_client
-from .tools import list_user_cars, resolve_zone, get_policy, find_car_by_identifier
-from .rules import decide_eligibility
+from .tools import list_user_cars, resolve_zone, get_policy, find_car_by_identifier, quick_intent
+from .rules import decide_eligibility, decide_fleet
 from app.infrastructure.logging_config import get_logger, get_trace_id
 from app.infrastructure.trace_store import get_trace_store
 
 logger = get_logger(__name__)
 
+# Shared pool for overlapping independent (blocking) calls with a node's LLM call
+_llm_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm")
+
+# Set by a streaming endpoint before invoking the graph: explain_node then
+# streams the explanation, passing each text delta to this callback
+explain_token_sink: ContextVar[Optional[Callable[[str], None]]] = ContextVar("explain_token_sink", default=None)
+
+# How often extract_intent_node classified a message without the LLM.
+# Nodes run on worker threads, so updates are made under the lock
+quick_intent_stats = {"hits": 0, "misses": 0}
+_quick_intent_stats_lock = threading.Lock()
+
+
+def get_quick_intent_stats() -> dict[str, int]:
+    """Snapshot of the quick_intent hit/miss counters."""
+    with _quick_intent_stats_lock:
+        return dict(quick_intent_stats)
+
 
 def _wrap_node(node_func, node_name: str):
     """Wrap a node function to capture trace information."""
@@ -22,16 +44,19 @@ def _wrap_node(node_func, node_name: str):
         
         trace_store = get_trace_store()
         
-        # Capture input state
-        input_state = state.model_dump()
+        # Capture input state. Nodes replace field values rather than
+        # mutating them (nested models are frozen), so a shallow copy of
+        # the fields is a faithful snapshot; the trace store serializes it
+        # only if the trace is read
+        input_state = dict(state.__dict__)
         
         # Execute node
-        start_time = time.time()
+        start = time.perf_counter_ns()
         result = node_func(state)
-        duration_ms = (time.time() - start_time) * 1000
+        duration_ms = (time.perf_counter_ns() - start) / 1e6
         
         # Capture output state
-        output_state = result.model_dump()
+        output_state = dict(result.__dict__)
         
         # Add to trace
         trace_store.add_step(
@@ -50,20 +75,33 @@ def _wrap_node(node_func, node_name: str):
 # ========== Graph Node Functions ==========
 
 def extract_intent_node(state: AgentState) -> AgentState:
-    """Extract intent and slots from user message using LLM."""
-    logger.info(f"[{state.session_id}] extract_intent_node - message: {state.message[:50]}...")
+    """Extract intent and slots from user message (regex fast path, else LLM)."""
+    logger.info("[%s] extract_intent_node - message: %s...", state.session_id, state.message[:50])
     
     llm = get_llm_client()
     
     # Detect language only for substantial messages or if not already set
-    # Short messages (like just a VIN) should keep the previous language
+    # Short messages (like just a VIN) should keep the previous language.
+    # Detection is independent of intent extraction, so both run concurrently.
     if not state.language or state.language == "en" and len(state.message.split()) > 3:
-        state.language = llm.call_detect_language(state.message)
-        logger.info(f"[{state.session_id}] Language detected: {state.language}")
+        language_future = _llm_pool.submit(
+            copy_context().run, llm.call_detect_language, state.message
+        )
+    else:
+        language_future = None
+        logger.info("[%s] Using previous language: %s", state.session_id, state.language)
+    
+    intent_data = quick_intent(state.message, list_user_cars(state.session_id))
+    with _quick_intent_stats_lock:
+        quick_intent_stats["misses" if intent_data is None else "hits"] += 1
+    if intent_data is None:
+        intent_data = llm.call_extract_intent_slots(state.message)
     else:
-        logger.info(f"[{state.session_id}] Using previous language: {state.language}")
+        logger.debug("[%s] Intent matched without LLM", state.session_id)
     
-    intent_data = llm.call_extract_intent_slots(state.message)
+    if language_future is not None:
+        state.language = language_future.result()
+        logger.info("[%s] Language detected: %s", state.session_id, state.language)
     
     # Preserve previous car context if new message doesn't specify a car
     previous_car_identifier = state.car_identifier
@@ -75,24 +113,24 @@ def extract_intent_node(state: AgentState) -> AgentState:
         # New car mentioned - use new intent
         state.intent = intent_data.intent
         state.car_identifier = intent_data.car_identifier
-        logger.info(f"[{state.session_id}] New car identifier from message: {state.car_identifier}, intent: {state.intent}")
+        logger.info("[%s] New car identifier from message: %s, intent: %s", state.session_id, state.car_identifier, state.intent)
     elif previous_car_identifier or previous_selected_car:
         # No car in message but we have previous car context - preserve single_car intent
         state.intent = "single_car"
         state.car_identifier = previous_car_identifier
         state.selected_car = previous_selected_car
-        logger.info(f"[{state.session_id}] No car in new message, preserving previous: {previous_car_identifier}, forcing intent to single_car")
+        logger.info("[%s] No car in new message, preserving previous: %s, forcing intent to single_car", state.session_id, previous_car_identifier)
     else:
         # No car context at all - use extracted intent
         state.intent = intent_data.intent
         state.car_identifier = None
-        logger.info(f"[{state.session_id}] No car context, intent: {state.intent}")
+        logger.info("[%s] No car context, intent: %s", state.session_id, state.intent)
     
     state.city = intent_data.city
     state.zone_phrase = intent_data.zone_phrase
     
-    logger.info(f"[{state.session_id}] Final state: intent={state.intent}, city={state.city}, "
-               f"car={state.car_identifier}, zone={state.zone_phrase}")
+    logger.info("[%s] Final state: intent=%s, city=%s, car=%s, zone=%s",
+                state.session_id, state.intent, state.city, state.car_identifier, state.zone_phrase)
     
     return state
 
@@ -115,8 +153,9 @@ def resolve_zone_node(state: AgentState) -> AgentState:
     
     if not candidates:
         state.reply = llm.call_translate_message(
-            f"I couldn't find any pollution zones in {state.city}. Please check the city name.",
-            state.language
+            "I couldn't find any pollution zones in {city}. Please check the city name.",
+            state.language,
+            city=state.city
         )
         state.pending_question = False
         state.next_step = "end"
@@ -127,21 +166,17 @@ def resolve_zone_node(state: AgentState) -> AgentState:
         state.selected_zone = candidates[0]
         state.zone_candidates = candidates
         state.next_step = "fetch_policy"
-        logger.info(f"[{state.session_id}] Zone resolved: {candidates[0].zone_name}")
+        logger.info("[%s] Zone resolved: %s", state.session_id, candidates[0].zone_name)
         return state
     
     # Multiple matches - ask for disambiguation
-    logger.info(f"[{state.session_id}] Zone disambiguation needed - {len(candidates)} candidates")
+    logger.info("[%s] Zone disambiguation needed - %s candidates", state.session_id, len(candidates))
     state.zone_candidates = candidates
     state.pending_question = True
     state.pending_type = "zone"
     
     options = [
-        {
-            "index": i,
-            "label": f"{c.zone_name} ({c.zone_type})",
-            "zone_id": c.zone_id
-        }
+        {"index": i, "label": c.option_label, "zone_id": c.zone_id}
         for i, c in enumerate(candidates)
     ]
     state.disambiguation_options = options
@@ -155,8 +190,10 @@ def resolve_zone_node(state: AgentState) -> AgentState:
 
 def resolve_car_node(state: AgentState) -> AgentState:
     """Resolve car(s) based on intent."""
-    logger.info(f"[{state.session_id}] resolve_car_node - intent: {state.intent}, identifier: {state.car_identifier}, "
-               f"selected_car: {state.selected_car.plate if state.selected_car else None}")
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("[%s] resolve_car_node - intent: %s, identifier: %s, selected_car: %s",
+                    state.session_id, state.intent, state.car_identifier,
+                    state.selected_car.plate if state.selected_car else None)
     
     llm = get_llm_client()
     cars = list_user_cars(state.session_id)
@@ -170,13 +207,14 @@ def resolve_car_node(state: AgentState) -> AgentState:
     # Single car intent
     if state.car_identifier:
         # Find specific car
-        logger.info(f"[{state.session_id}] Looking for car with identifier: {state.car_identifier}")
+        logger.info("[%s] Looking for car with identifier: %s", state.session_id, state.car_identifier)
         matches = find_car_by_identifier(cars, state.car_identifier)
         
         if not matches:
             state.reply = llm.call_translate_message(
-                f"I couldn't find a car matching '{state.car_identifier}'. Please check the plate number.",
-                state.language
+                "I couldn't find a car matching '{car_identifier}'. Please check the plate number.",
+                state.language,
+                car_identifier=state.car_identifier
             )
             state.pending_question = False
             state.next_step = "end"
@@ -188,17 +226,13 @@ def resolve_car_node(state: AgentState) -> AgentState:
             return state
         
         # Multiple matches - ask for disambiguation
-        logger.info(f"[{state.session_id}] Car disambiguation needed - {len(matches)} matches")
+        logger.info("[%s] Car disambiguation needed - %s matches", state.session_id, len(matches))
         state.cars = matches
         state.pending_question = True
         state.pending_type = "car"
         
         options = [
-            {
-                "index": i,
-                "label": f"{c.plate} ({c.fuel_type or 'unknown fuel'}, {c.euro_class or 'unknown euro class'})",
-                "car_id": c.car_id
-            }
+            {"index": i, "label": c.option_label, "car_id": c.car_id}
             for i, c in enumerate(matches)
         ]
         state.disambiguation_options = options
@@ -211,7 +245,7 @@ def resolve_car_node(state: AgentState) -> AgentState:
     
     # No identifier - check if we have a selected car from previous turn
     if state.selected_car:
-        logger.info(f"[{state.session_id}] No car identifier in message, using previous selected_car: {state.selected_car.plate}")
+        logger.info("[%s] No car identifier in message, using previous selected_car: %s", state.session_id, state.selected_car.plate)
         state.next_step = "resolve_zone"
         return state
     
@@ -223,11 +257,7 @@ def resolve_car_node(state: AgentState) -> AgentState:
         state.pending_type = "car"
         
         options = [
-            {
-                "index": i,
-                "label": f"{c.plate} ({c.fuel_type or 'unknown fuel'}, {c.euro_class or 'unknown euro class'})",
-                "car_id": c.car_id
-            }
+            {"index": i, "label": c.option_label, "car_id": c.car_id}
             for i, c in enumerate(cars)
         ]
         state.disambiguation_options = options
@@ -255,7 +285,7 @@ def resolve_car_node(state: AgentState) -> AgentState:
 
 def fetch_policy_node(state: AgentState) -> AgentState:
     """Fetch policy for selected zone."""
-    logger.info(f"[{state.session_id}] fetch_policy_node - zone: {state.selected_zone.zone_id if state.selected_zone else 'None'}")
+    logger.info("[%s] fetch_policy_node - zone: %s", state.session_id, state.selected_zone.zone_id if state.selected_zone else 'None')
     
     llm = get_llm_client()
     
@@ -268,8 +298,9 @@ def fetch_policy_node(state: AgentState) -> AgentState:
     
     if not policy:
         state.reply = llm.call_translate_message(
-            f"I couldn't find policy information for {state.selected_zone.zone_name}.",
-            state.language
+            "I couldn't find policy information for {zone_name}.",
+            state.language,
+            zone_name=state.selected_zone.zone_name
         )
         state.next_step = "end"
         return state
@@ -280,9 +311,30 @@ def fetch_policy_node(state: AgentState) -> AgentState:
     return state
 
 
+def resolve_all_node(state: AgentState) -> AgentState:
+    """
+    Resolve car(s), zone and policy in a single graph step.
+    
+    These are deterministic lookups, so running them as one node saves
+    the per-node state merge and trace snapshot. Stops early (next_step
+    "end") on an error reply or when a disambiguation question is asked;
+    the individual nodes remain the resume points after an answer.
+    """
+    if state.intent != "policy_only":
+        state = resolve_car_node(state)
+        if state.pending_question or state.next_step == "end":
+            return state
+    
+    state = resolve_zone_node(state)
+    if state.pending_question or state.next_step == "end":
+        return state
+    
+    return fetch_policy_node(state)
+
+
 def decide_node(state: AgentState) -> AgentState:
     """Make eligibility decision(s)."""
-    logger.info(f"[{state.session_id}] decide_node - intent: {state.intent}")
+    logger.info("[%s] decide_node - intent: %s", state.session_id, state.intent)
     
     llm = get_llm_client()
     
@@ -298,15 +350,11 @@ def decide_node(state: AgentState) -> AgentState:
     
     if state.intent == "fleet":
         # Decide for all cars
-        fleet_decisions = []
-        for car in state.cars:
-            decision = decide_eligibility(car, state.policy)
-            fleet_decisions.append(FleetDecision(
-                car_id=car.car_id,
-                plate=car.plate,
-                decision=decision
-            ))
-        state.fleet_decisions = fleet_decisions
+        decisions = decide_fleet(state.cars, state.policy)
+        state.fleet_decisions = [
+            FleetDecision(car_id=car.car_id, plate=car.plate, decision=decision)
+            for car, decision in zip(state.cars, decisions)
+        ]
     else:
         # Single car decision
         if not state.selected_car:
@@ -323,7 +371,7 @@ def decide_node(state: AgentState) -> AgentState:
 
 def explain_node(state: AgentState) -> AgentState:
     """Generate final explanation using LLM."""
-    logger.info(f"[{state.session_id}] explain_node - generating final response")
+    logger.info("[%s] explain_node - generating final response", state.session_id)
     
     llm = get_llm_client()
     
@@ -335,7 +383,8 @@ def explain_node(state: AgentState) -> AgentState:
         cars=state.cars,
         policy=state.policy,
         zone=state.selected_zone,
-        language=state.language
+        language=state.language,
+        on_token=explain_token_sink.get()
     )
     
     state.reply = explanation
@@ -346,36 +395,6 @@ def explain_node(state: AgentState) -> AgentState:
 
 # ========== Routing Functions ==========
 
-def route_after_intent(state: AgentState) -> str:
-    """Route based on extracted intent."""
-    if state.intent == "policy_only":
-        return "resolve_zone"
-    else:
-        return "resolve_car"  # Resolve car first for car-related queries
-
-
-def route_after_zone(state: AgentState) -> str:
-    """Route after zone resolution."""
-    if state.pending_question:
-        return "end"
-    
-    # Respect explicit next_step from node
-    if state.next_step == "fetch_policy":
-        return "fetch_policy"
-    
-    if state.intent == "policy_only":
-        return "fetch_policy"
-    else:
-        return "resolve_car"
-
-
-def route_after_car(state: AgentState) -> str:
-    """Route after car resolution."""
-    if state.pending_question or state.next_step == "end":
-        return "end"
-    return "resolve_zone"  # Go to zone resolution next
-
-
 def route_next_step(state: AgentState) -> str:
     """Generic router based on next_step field."""
     return state.next_step
@@ -391,9 +410,7 @@ def build_graph() -> StateGraph:
     
     # Add nodes (wrapped for tracing)
     graph.add_node("extract_intent", _wrap_node(extract_intent_node, "extract_intent"))
-    graph.add_node("resolve_zone", _wrap_node(resolve_zone_node, "resolve_zone"))
-    graph.add_node("resolve_car", _wrap_node(resolve_car_node, "resolve_car"))
-    graph.add_node("fetch_policy", _wrap_node(fetch_policy_node, "fetch_policy"))
+    graph.add_node("resolve_all", _wrap_node(resolve_all_node, "resolve_all"))
     graph.add_node("decide", _wrap_node(decide_node, "decide"))
     graph.add_node("explain", _wrap_node(explain_node, "explain"))
     
@@ -401,36 +418,10 @@ def build_graph() -> StateGraph:
     graph.set_entry_point("extract_intent")
     
     # Add edges
-    graph.add_conditional_edges(
-        "extract_intent",
-        route_after_intent,
-        {
-            "resolve_zone": "resolve_zone",
-            "resolve_car": "resolve_car",
-        }
-    )
-    
-    graph.add_conditional_edges(
-        "resolve_zone",
-        route_after_zone,
-        {
-            "end": END,
-            "fetch_policy": "fetch_policy",
-            "resolve_car": "resolve_car",
-        }
-    )
-    
-    graph.add_conditional_edges(
-        "resolve_car",
-        route_after_car,
-        {
-            "end": END,
-            "resolve_zone": "resolve_zone",
-        }
-    )
+    graph.add_edge("extract_intent", "resolve_all")
     
     graph.add_conditional_edges(
-        "fetch_policy",
+        "resolve_all",
         route_next_step,
         {
             "decide": "decide",
@@ -458,7 +449,8 @@ def build_graph() -> StateGraph:
     return graph.compile()
 
 
-# Global compiled graph
+# Global compiled graph, with the recursion limit bound once (with_config
+# allocates a new Runnable wrapper, so it must not run per request)
 _compiled_graph = None
 
 
@@ -466,5 +458,5 @@ def get_graph():
     """Get or create compiled graph."""
     global _compiled_graph
     if _compiled_graph is None:
-        _compiled_graph = build_graph()
-    return _compiled_graph.with_config({"recursion_limit": 50})
+        _compiled_graph = build_graph().with_config({"recursion_limit": 50})
+    return _compiled_graph
@@ -0,0 +1,102 @@
+"""Exact-match response cache for deterministic LLM calls."""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Protocol
+
+class CacheBackend(Protocol):
+    """Storage used by LLMCache (in-process by default, e.g. Redis in production)."""
+    
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value, or None on a miss."""
+        ...
+    
+    def set(self, key: str, value: str) -> None:
+        """Store a value."""
+        ...
+
+
+class InMemoryCacheBackend:
+    """Thread-safe LRU cache with a per-entry time-to-live."""
+    
+    def __init__(self, maxsize: int = 10_000, ttl: float = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+    
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+    
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class LLMCache:
+    """
+    Cache LLM responses keyed by (model, messages, temperature).
+    
+    By default only low-temperature calls (<= max_temperature) are cached:
+    language detection, translation, intent extraction. A caller can
+    override this per call with LLMClient._call_llm(cacheable=...);
+    call_explain does, so explanations are reused for an identical
+    rendered prompt despite their higher temperature. Streamed calls are
+    never cached.
+    """
+    
+    def __init__(
+        self,
+        backend: Optional[CacheBackend] = None,
+        max_temperature: float = 0.3
+    ):
+        self.backend = backend if backend is not None else InMemoryCacheBackend()
+        self.max_temperature = max_temperature
+        self.stats = {"hits": 0, "misses": 0}
+        # get() runs on graph worker threads; counters are updated under it
+        self._stats_lock = threading.Lock()
+    
+    def accepts(self, temperature: float) -> bool:
+        """Whether calls made at this temperature are cacheable."""
+        return temperature <= self.max_temperature
+    
+    @staticmethod
+    def key(
+        model: str,
+        messages: list[dict],
+        temperature: float,
+        response_format: Optional[str] = None
+    ) -> str:
+        """Stable SHA-256 key for a chat completion request."""
+        request = {"model": model, "messages": messages, "temperature": temperature}
+        if response_format is not None:
+            request["response_format"] = response_format
+        raw = json.dumps(request, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(raw.encode()).hexdigest()
+    
+    def get(self, key: str) -> Optional[str]:
+        value = self.backend.get(key)
+        with self._stats_lock:
+            self.stats["misses" if value is None else "hits"] += 1
+        return value
+    
+    def set(self, key: str, value: str) -> None:
+        self.backend.set(key, value)
+
@@ -1,11 +1,12 @@
 """Agent messaging protocol for inter-agent communication."""
 
-from pydantic import BaseModel, Field
-from datetime import datetime
-from typing import Dict, List, Any, Optional
+from dataclasses import dataclass, field
+from time import monotonic_ns
+from typing import Dict, Any, Mapping, Optional, Sequence
 
 
-class AgentMessage(BaseModel):
+@dataclass(slots=True)
+class AgentMessage:
     """
     Standard message format for communication between agents.
     
@@ -23,26 +24,22 @@ class AgentMessage(BaseModel):
         payload: Request/response data (domain-specific)
         context: Shared context across agents (optional)
         conversation_history: Chat history from client (stateless design)
-        timestamp: When message was created
-    """
+        timestamp: When message was created (time.monotonic_ns(), for
+            ordering/latency only - not wall-clock time)
     
-    trace_id: str = Field(..., description="Unique ID for this request")
-    correlation_id: str = Field(..., description="Links related traces")
-    sender: str = Field(..., description="Sending agent name")
-    receiver: str = Field(..., description="Target agent name")
-    payload: Dict[str, Any] = Field(..., description="Request/response data")
-    context: Dict[str, Any] = Field(default_factory=dict, description="Shared context")
-    conversation_history: List[Dict[str, str]] = Field(
-        default_factory=list,
-        description="Chat history from client (stateless)"
-    )
-    timestamp: datetime = Field(default_factory=datetime.now)
+    Messages are internal (API input is validated by the request models),
+    so this is a plain slotted dataclass without per-construction
+    validation. Fields are ordered for positional construction on hot paths.
+    """
     
-    class Config:
-        arbitrary_types_allowed = True
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    trace_id: str  # Unique ID for this request
+    correlation_id: str  # Links related traces
+    sender: str  # Sending agent name
+    receiver: str  # Target agent name
+    payload: Dict[str, Any]  # Request/response data
+    context: Dict[str, Any] = field(default_factory=dict)  # Shared context
+    conversation_history: Sequence[Mapping[str, str]] = ()  # Chat history from client (stateless)
+    timestamp: int = field(default_factory=monotonic_ns)
     
     def create_reply(
         self,
@@ -60,12 +57,11 @@ class AgentMessage(BaseModel):
             New AgentMessage with swapped sender/receiver
         """
         return AgentMessage(
-            trace_id=self.trace_id,
-            correlation_id=self.correlation_id,
-            sender=self.receiver,  # Swap
-            receiver=self.sender,  # Swap
-            payload=payload,
-            context=context or self.context,
-            conversation_history=self.conversation_history,
-            timestamp=datetime.now()
+            self.trace_id,
+            self.correlation_id,
+            self.receiver,  # Swap
+            self.sender,  # Swap
+            payload,
+            context or self.context,
+            self.conversation_history
         )
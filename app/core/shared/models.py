@@ -1,46 +1,78 @@
 """Pydantic models for the Agent Orchestrator service."""
 from datetime import date
-from typing import Literal, Optional
-from pydantic import BaseModel, Field
+from functools import cached_property
+from typing import Literal, Optional, Sequence
+from pydantic import BaseModel, ConfigDict, Field
 
 
 # ========== Car Domain ==========
 
 class Car(BaseModel):
     """Represents a vehicle."""
+    model_config = ConfigDict(frozen=True)
+    
     car_id: str
     plate: str
     fuel_type: Optional[str] = None  # e.g., "diesel", "petrol", "electric", "hybrid"
     euro_class: Optional[str] = None  # e.g., "euro4", "euro5", "euro6"
     first_reg_date: Optional[date] = None
     vehicle_category: Optional[str] = None  # e.g., "M1" (passenger), "N1" (light commercial)
+    
+    @cached_property
+    def option_label(self) -> str:
+        """Label shown when the user must choose between cars."""
+        return f"{self.plate} ({self.fuel_type or 'unknown fuel'}, {self.euro_class or 'unknown euro class'})"
 
 
 # ========== Zone Domain ==========
 
 class ZoneCandidate(BaseModel):
     """A potential pollution zone match."""
+    model_config = ConfigDict(frozen=True)
+    
     city: str
     zone_id: str
     zone_name: str
     zone_type: str  # e.g., "LEZ" (Low Emission Zone), "ZEZ" (Zero Emission Zone)
+    
+    @cached_property
+    def option_label(self) -> str:
+        """Label shown when the user must choose between zones."""
+        return f"{self.zone_name} ({self.zone_type})"
 
 
 class ZonePolicyRule(BaseModel):
     """A single rule within a zone policy."""
+    model_config = ConfigDict(frozen=True)
+    
     condition: str  # human-readable condition
     verdict: Literal["banned", "allowed"]
-    applies_to: list[str]  # e.g., ["diesel", "euro4"]
+    applies_to: frozenset[str]  # e.g., {"diesel", "euro4"}
+    
+    # Derived lookups for rules.py, computed once per (frozen) rule
+    @cached_property
+    def applies_to_lower(self) -> frozenset[str]:
+        return frozenset(a.lower() for a in self.applies_to)
+    
+    @cached_property
+    def has_euro_token(self) -> bool:
+        return any(a.startswith("euro") for a in self.applies_to_lower)
+    
+    @cached_property
+    def is_n1_non_electric(self) -> bool:
+        return "N1" in self.applies_to and "non_electric" in self.applies_to
 
 
 class ZonePolicy(BaseModel):
     """Pollution policy for a specific zone."""
+    model_config = ConfigDict(frozen=True)
+    
     city: str
     zone_id: str
     zone_name: str
     effective_from: date
-    rules: list[ZonePolicyRule]
-    exemptions: list[str] = Field(default_factory=list)  # e.g., ["vintage_cars", "disabled_permit"]
+    rules: tuple[ZonePolicyRule, ...]
+    exemptions: tuple[str, ...] = ()  # e.g., ("vintage_cars", "disabled_permit")
 
 
 # ========== Decision Domain ==========
@@ -87,7 +119,7 @@ class AgentState(BaseModel):
     zone_phrase: Optional[str] = None
     
     # Resolved entities
-    cars: list[Car] = Field(default_factory=list)
+    cars: Sequence[Car] = Field(default_factory=list)  # may be the store's tuple
     selected_car: Optional[Car] = None
     zone_candidates: list[ZoneCandidate] = Field(default_factory=list)
     selected_zone: Optional[ZoneCandidate] = None
@@ -0,0 +1,80 @@
+"""Client-side rate limiting for OpenAI requests (RPM/TPM token buckets)."""
+import threading
+import time
+from functools import lru_cache
+from typing import Callable
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket that refills continuously at ``per_minute``.
+    
+    acquire() blocks until enough capacity is available, so callers stay
+    under the account limit instead of bursting into 429 responses.
+    """
+    
+    def __init__(
+        self,
+        per_minute: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0  # tokens per second
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+    
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    def acquire(self, amount: float = 1.0) -> None:
+        """Take ``amount`` tokens, waiting for the bucket to refill if needed."""
+        # A single request larger than the bucket would otherwise wait forever
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait = (amount - self._tokens) / self.rate
+            self._sleep(wait)
+
+
+@lru_cache(maxsize=8)
+def _encoder_for(model: str):
+    """tiktoken encoder for a model, or None if tiktoken/its data is unavailable."""
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+
+@lru_cache(maxsize=4096)
+def _count_tokens(model: str, content: str) -> int:
+    """
+    Token count of one message body.
+    
+    Memoized so the static system prompts (and repeated history turns)
+    are tokenized once rather than on every request.
+    """
+    encoder = _encoder_for(model)
+    return len(encoder.encode(content)) if encoder else len(content) // 4
+
+
+def estimate_tokens(messages: list[dict], model: str) -> int:
+    """Estimate prompt tokens for a chat request (~4 chars/token fallback)."""
+    total = 0
+    for message in messages:
+        # ~4 tokens of per-message overhead (role, separators)
+        total += 4 + _count_tokens(model, message.get("content") or "")
+    return total + 2
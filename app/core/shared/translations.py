@@ -0,0 +1,50 @@
+"""Lookup table for system-generated messages, so fixed strings skip the LLM."""
+import string
+import threading
+from pathlib import Path
+from typing import Optional
+
+import yaml
+
+TRANSLATIONS_FILE = Path(__file__).with_name("translations.yaml")
+
+
+def load_translations(path: Path = TRANSLATIONS_FILE) -> dict[tuple[str, str], str]:
+    """Read translations.yaml into a {(english_message, language): text} table."""
+    with open(path, encoding="utf-8") as f:
+        entries = yaml.safe_load(f) or {}
+    return {
+        (message, language): text
+        for message, translations in entries.items()
+        for language, text in translations.items()
+    }
+
+
+_TRANSLATIONS = load_translations()
+_lock = threading.Lock()
+
+
+def placeholders(template: str) -> frozenset[str]:
+    """Names of the {placeholders} in a message template."""
+    return frozenset(name for _, name, _, _ in string.Formatter().parse(template) if name)
+
+
+def lookup(message: str, language: str) -> Optional[str]:
+    """Translated template for a message, or None if it isn't in the table."""
+    return _TRANSLATIONS.get((message, language))
+
+
+def remember(message: str, language: str, translation: str) -> None:
+    """
+    Add an LLM translation to the in-process table.
+    
+    Only kept if it preserves the message's placeholders, so the table
+    never returns a template that cannot be filled in.
+    """
+    try:
+        if placeholders(translation) != placeholders(message):
+            return
+    except ValueError:  # unbalanced braces
+        return
+    with _lock:
+        _TRANSLATIONS[(message, language)] = translation
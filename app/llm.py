@@ -1,37 +1,397 @@
 """LLM client wrapper for OpenAI API with retry/repair logic."""
+import importlib.util
+import io
 import json
 import os
+import random
 import re
-from typing import Any, Optional, Type, TypeVar
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Callable, Optional, Type, TypeVar
 from pydantic import BaseModel, ValidationError
-from openai import OpenAI
+from tenacity import RetryCallState, retry, retry_if_exception, stop_after_attempt
 
 from app.models import IntentRequest, Car, ZoneCandidate, ZonePolicy, Decision
+from app.core.shared.llm_cache import LLMCache
+from app.core.shared.rate_limit import TokenBucket, estimate_tokens
+from app.core.shared import translations
 
 
 T = TypeVar('T', bound=BaseModel)
 
+MAX_BACKOFF_SECONDS = 60.0
+
+
+@lru_cache(maxsize=None)
+def _openai_errors() -> tuple[tuple[type, ...], tuple[type, ...]]:
+    """
+    (retryable, structured-output fallback) OpenAI error types.
+    
+    openai (and httpx under it) is imported on first use rather than at
+    module import, which keeps worker start-up fast.
+    """
+    import openai
+    return (
+        # Transient errors worth retrying (anything else is raised immediately)
+        (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError),
+        # Structured-output failures that fall back to a plain call + parse/repair
+        (openai.BadRequestError, openai.LengthFinishReasonError, openai.ContentFilterFinishReasonError),
+    )
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    return isinstance(exc, _openai_errors()[0])
+
+
+# Languages the local detector chooses between (as offered in the LLM prompt)
+_LOCAL_DETECTION_LANGUAGES = ("ENGLISH", "SPANISH", "FRENCH", "DUTCH", "GERMAN", "ITALIAN", "PORTUGUESE")
+# Below this confidence the message is sent to the LLM instead. Kept high:
+# lingua gives 0.5-0.8 to "Dutch" for short English questions about Dutch cities
+LOCAL_DETECTION_MIN_CONFIDENCE = 0.9
+# Messages with fewer words left after _strip_names() go to the LLM
+LOCAL_DETECTION_MIN_WORDS = 3
+
+# License plates ("AB-123-CD"), which say nothing about the language
+_PLATE_TOKEN = re.compile(r"\b(?=[A-Z0-9-]*\d)[A-Z0-9]{1,3}(?:-[A-Z0-9]{1,3}){2}\b", re.IGNORECASE)
+
+
+@lru_cache(maxsize=None)
+def _local_language_detector():
+    """Offline lingua detector, or None if lingua is not installed."""
+    try:
+        from lingua import Language, LanguageDetectorBuilder
+    except ImportError:
+        return None
+    languages = [getattr(Language, name) for name in _LOCAL_DETECTION_LANGUAGES]
+    # High-accuracy mode: low-accuracy mode is confidently wrong on short
+    # chat messages containing place names ("... in Amsterdam" -> Dutch)
+    return LanguageDetectorBuilder.from_languages(*languages).build()
+
+
+def _strip_names(message: str) -> list[str]:
+    """
+    Words of the message that say something about its language.
+    
+    Drops plates and capitalized words inside a sentence (city names such
+    as "Rotterdam", zone codes such as "LEZ", car makes), which otherwise
+    pull short English questions towards Dutch. German nouns go too; the
+    rest of a German sentence is still clearly German.
+    """
+    words = []
+    sentence_start = True
+    for word in _PLATE_TOKEN.sub(" ", message).split():
+        letters = word.lstrip("¿¡\"'(")
+        if sentence_start or not letters[:1].isupper() or letters.rstrip("?!.,") == "I":
+            words.append(word)
+        sentence_start = word.endswith((".", "!", "?"))
+    return words
+
+# Markdown code fences sometimes wrapped around JSON responses
+_MD_OPEN = re.compile(r'^```(?:json)?\s*\n', re.MULTILINE)
+_MD_CLOSE = re.compile(r'\n```\s*$', re.MULTILINE)
+
+
+def _backoff(retry_state: RetryCallState) -> float:
+    """
+    Seconds to wait before the next attempt.
+    
+    Uses the server's Retry-After header when present, otherwise full
+    jitter: uniform in [0, min(60, 2**attempt)].
+    """
+    response = getattr(retry_state.outcome.exception(), "response", None)
+    if response is not None:
+        try:
+            return min(MAX_BACKOFF_SECONDS, float(response.headers.get("retry-after")))
+        except (TypeError, ValueError):
+            pass
+    return random.uniform(0, min(MAX_BACKOFF_SECONDS, 2 ** retry_state.attempt_number))
+
+
+# ========== Prompts ==========
+# Static instructions live in the system message and at the start of each
+# user template; per-request values come last. Requests of the same kind
+# therefore share a byte-identical prefix, which OpenAI's automatic prompt
+# caching can reuse once that prefix is long enough (>= 1024 tokens).
+
+_DETECT_LANGUAGE_SYSTEM = """You are a language detection assistant. Detect the language of the user message and return ONLY the ISO 639-1 two-letter language code.
+
+Common codes:
+- en: English
+- es: Spanish
+- fr: French
+- nl: Dutch
+- de: German
+- it: Italian
+- pt: Portuguese
+
+Respond with ONLY the two-letter language code, nothing else."""
+
+_TRANSLATE_SYSTEM = """You are a translation assistant. Translate concisely and accurately.
+Keep any {placeholders} in curly braces exactly as they are.
+Respond with ONLY the translated message, nothing else."""
+
+_INTENT_SYSTEM = """You are an intent classifier for a car pollution zone eligibility service.
+
+Analyze the user's message and extract:
+1. intent: one of "single_car", "fleet", or "policy_only"
+   - single_car: user asks about ONE specific car
+   - fleet: user asks about ALL/MULTIPLE cars (e.g., "which of my cars", "are any of my cars")
+   - policy_only: user only asks about zone rules, no specific car
+
+2. car_identifier: plate number or identifying phrase (null if not mentioned or if fleet/policy_only)
+3. city: city name (null if not mentioned)
+4. zone_phrase: phrase describing the zone (e.g., "city center", "downtown", null if not mentioned)
+
+Respond with ONLY valid JSON matching this schema:
+{
+  "intent": "single_car" | "fleet" | "policy_only",
+  "car_identifier": string or null,
+  "city": string or null,
+  "zone_phrase": string or null
+}"""
+
+_DISAMBIGUATION_SYSTEM = """You are a helpful assistant. Be concise and clear.
+Generate ONLY the question text, no extra formatting."""
+
+_EXPLAIN_SYSTEM = "You are a helpful assistant explaining car pollution zone eligibility. Be clear, concise, and friendly."
+
+_POLICY_PROMPT = """Explain the pollution zone policy to the user in a clear, friendly way.
+Provide a 2-3 sentence summary suitable for a chatbot response.
+Then append a helpful note: mention that they can get a specific eligibility check for their vehicle by providing their car's plate number or VIN.
+
+Zone: {zone}
+City: {city}
+Type: {zone_type}
+
+Policy effective from: {effective_from}
+Rules:
+{rules}
+
+Exemptions: {exemptions}
+
+IMPORTANT: Respond in the language with ISO 639-1 code: {language}"""
+
+_SINGLE_CAR_PROMPT = """Explain the eligibility decision to the user clearly and concisely.
+Provide a clear 2-4 sentence explanation suitable for a chatbot response. If there are missing fields or next actions, mention them.
+
+Car: {plate} ({fuel}, {euro})
+Zone: {zone}
+Allowed: {allowed}
+Reason: {reason}
+Factors: {factors}
+Missing fields: {missing}
+Next actions: {actions}
+
+IMPORTANT: Respond in the language with ISO 639-1 code: {language}"""
+
+_FLEET_PROMPT = """Summarize the fleet eligibility check for the user.
+Provide a clear summary suitable for a chatbot response. List cars by category (allowed, not allowed, unknown) and mention why if relevant.
+
+Zone: {zone}
+Total cars checked: {total}
+Allowed: {n_allowed} ({allowed})
+Not allowed: {n_banned} ({banned})
+Unknown: {n_unknown} ({unknown})
+
+IMPORTANT: Respond in the language with ISO 639-1 code: {language}"""
+
+
+def _join_or_none(items) -> str:
+    """Comma-join a list for a prompt, or 'None' if empty/missing."""
+    return ', '.join(items) if items else 'None'
+
+
+@lru_cache(maxsize=256)
+def _policy_prompt(
+    policy: Optional[ZonePolicy],
+    zone: Optional[ZoneCandidate],
+    language: str
+) -> str:
+    """Render the policy_only prompt (memoized; policies/zones are frozen)."""
+    return _POLICY_PROMPT.format(
+        zone=zone.zone_name if zone else 'Unknown',
+        city=zone.city if zone else 'Unknown',
+        zone_type=zone.zone_type if zone else 'Unknown',
+        effective_from=policy.effective_from if policy else 'Unknown',
+        rules="\n".join(f"- {rule.condition}: {rule.verdict}" for rule in policy.rules) if policy else 'No rules available',
+        exemptions=', '.join(policy.exemptions) if policy and policy.exemptions else 'None',
+        language=language
+    )
+
 
 class LLMClient:
     """Wrapper for OpenAI API calls with structured output parsing."""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        cache: Optional[LLMCache] = None,
+        max_concurrent: int = 10,
+        max_requests_per_minute: float = 500,
+        max_tokens_per_minute: float = 200_000
+    ):
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("OPENAI_API_KEY environment variable must be set")
-        self.client = OpenAI(api_key=self.api_key)
+        import httpx
+        from openai import DefaultHttpxClient, OpenAI  # deferred, see _openai_errors
+        
+        # One pooled keep-alive transport shared by all calls; with HTTP/2
+        # (when h2 is installed) concurrent requests share a single connection
+        http_client = DefaultHttpxClient(
+            http2=importlib.util.find_spec("h2") is not None,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+            timeout=httpx.Timeout(60.0, connect=5.0)
+        )
+        # Retries are handled by _create_completion (with jitter), not the SDK
+        self.client = OpenAI(api_key=self.api_key, max_retries=0, http_client=http_client)
         self.default_model = "gpt-4o-mini"
         self.fallback_model = "gpt-4o-mini"  # In real setup, use gpt-4 or similar as fallback
+        # Responses to low-temperature calls are reused for identical requests
+        self.cache = cache if cache is not None else LLMCache()
+        # Caps in-flight API requests when calls are issued from several threads
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        # Stay under the account's request/token limits instead of hitting 429s
+        self.rpm_bucket = TokenBucket(max_requests_per_minute)
+        self.tpm_bucket = TokenBucket(max_tokens_per_minute)
+        # Prompt tokens billed vs. served from OpenAI's prompt cache
+        self.prompt_cache_stats = {"prompt_tokens": 0, "cached_tokens": 0}
+        # Completions finish on several threads; usage is added under it
+        self._usage_lock = threading.Lock()
     
-    def _call_llm(self, messages: list[dict], model: str, temperature: float = 0.7) -> str:
-        """Make raw API call to OpenAI."""
-        response = self.client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=temperature
-        )
+    def _call_llm(
+        self,
+        messages: list[dict],
+        model: str,
+        temperature: float = 0.7,
+        response_format: Optional[Type[BaseModel]] = None,
+        cacheable: Optional[bool] = None
+    ) -> str:
+        """
+        Make raw API call to OpenAI (served from cache when possible).
+        
+        With response_format, the request uses native structured outputs
+        (JSON schema from the pydantic model) and the returned text is
+        JSON that validates against it. cacheable overrides the cache's
+        temperature rule for callers that want a single answer per prompt.
+        """
+        if cacheable is None:
+            cacheable = self.cache.accepts(temperature)
+        if cacheable:
+            key = self.cache.key(
+                model, messages, temperature,
+                response_format.__name__ if response_format else None
+            )
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        
+        text = self._create_completion(messages, model, temperature, response_format)
+        
+        if cacheable:
+            self.cache.set(key, text)
+        return text
+    
+    @retry(
+        retry=retry_if_exception(_is_retryable),
+        wait=_backoff,
+        stop=stop_after_attempt(6),
+        reraise=True
+    )
+    def _create_completion(
+        self,
+        messages: list[dict],
+        model: str,
+        temperature: float,
+        response_format: Optional[Type[BaseModel]] = None
+    ) -> str:
+        """Single rate-limited API request; transient errors are retried with backoff."""
+        self.rpm_bucket.acquire(1)
+        self.tpm_bucket.acquire(estimate_tokens(messages, model))
+        with self._slots:
+            if response_format is None:
+                response = self.client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature
+                )
+            else:
+                response = self.client.beta.chat.completions.parse(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    response_format=response_format
+                )
+        self._record_usage(response.usage)
         return response.choices[0].message.content.strip()
     
+    def _record_usage(self, usage) -> None:
+        """Accumulate prompt-cache usage (cached_tokens > 0 means a prefix hit)."""
+        if usage is None:
+            return
+        details = usage.prompt_tokens_details
+        cached_tokens = (details.cached_tokens or 0) if details else 0
+        with self._usage_lock:
+            self.prompt_cache_stats["prompt_tokens"] += usage.prompt_tokens
+            self.prompt_cache_stats["cached_tokens"] += cached_tokens
+    
+    @retry(
+        retry=retry_if_exception(_is_retryable),
+        wait=_backoff,
+        stop=stop_after_attempt(6),
+        reraise=True
+    )
+    def _open_stream(self, messages: list[dict], model: str, temperature: float):
+        """
+        Start a streaming completion (only opening the stream is retried).
+        
+        On success the caller holds one of self._slots and must release it
+        once the stream is consumed; a failed attempt releases it, so no
+        slot is held while retry waits.
+        """
+        self.rpm_bucket.acquire(1)
+        self.tpm_bucket.acquire(estimate_tokens(messages, model))
+        self._slots.acquire()
+        try:
+            return self.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                stream=True
+            )
+        except BaseException:
+            self._slots.release()
+            raise
+    
+    def _call_llm_stream(
+        self,
+        messages: list[dict],
+        model: str,
+        temperature: float,
+        on_token: Callable[[str], None]
+    ) -> str:
+        """
+        Stream a completion, passing each text delta to on_token as it
+        arrives, and return the full (stripped) text at the end.
+        
+        Used for user-facing text so a caller can start forwarding output
+        at the first token. Streamed responses are not cached.
+        """
+        parts = []
+        stream = self._open_stream(messages, model, temperature)
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    on_token(delta)
+        finally:
+            self._slots.release()
+        return "".join(parts).strip()
+    
     def _parse_with_repair(
         self, 
         response_text: str, 
@@ -47,9 +407,8 @@ class LLMClient:
         try:
             # Clean markdown code blocks if present
             cleaned = self._strip_markdown_json(response_text)
-            data = json.loads(cleaned)
-            return model_class.model_validate(data)
-        except (json.JSONDecodeError, ValidationError) as e:
+            return model_class.model_validate_json(cleaned)
+        except ValidationError as e:  # also raised for malformed JSON
             # Attempt repair: ask model to output ONLY valid JSON
             repair_messages = original_messages + [
                 {"role": "assistant", "content": response_text},
@@ -64,9 +423,8 @@ class LLMClient:
             
             try:
                 cleaned = self._strip_markdown_json(repaired_response)
-                data = json.loads(cleaned)
-                return model_class.model_validate(data)
-            except (json.JSONDecodeError, ValidationError) as e2:
+                return model_class.model_validate_json(cleaned)
+            except ValidationError as e2:
                 # Last resort: try with fallback model
                 if model != self.fallback_model:
                     return self._structured_call(original_messages, model_class, self.fallback_model)
@@ -75,10 +433,13 @@ class LLMClient:
     
     def _strip_markdown_json(self, text: str) -> str:
         """Remove markdown code block markers from JSON response."""
+        stripped = text.strip()
+        # Most structured responses are bare JSON - skip the regexes
+        # (a response starting with '{' cannot be fenced)
+        if stripped[:1] == '{' or '```' not in stripped:
+            return stripped
         # Remove ```json ... ``` or ``` ... ```
-        text = re.sub(r'^```(?:json)?\s*\n', '', text, flags=re.MULTILINE)
-        text = re.sub(r'\n```\s*$', '', text, flags=re.MULTILINE)
-        return text.strip()
+        return _MD_CLOSE.sub('', _MD_OPEN.sub('', stripped)).strip()
     
     def _structured_call(
         self, 
@@ -88,38 +449,119 @@ class LLMClient:
     ) -> T:
         """
         Make LLM call expecting structured JSON response.
-        Includes retry and repair logic.
+        
+        Uses OpenAI structured outputs so the response already matches the
+        model_class schema; if the API rejects the request (or the output
+        is truncated/filtered), falls back to a plain call with the
+        parse/repair logic.
+        
+        Uses a low temperature (extraction should be deterministic), which
+        also makes the call cacheable.
         """
         if model is None:
             model = self.default_model
         
-        response_text = self._call_llm(messages, model)
+        try:
+            response_text = self._call_llm(
+                messages, model, temperature=0.3, response_format=model_class
+            )
+        except _openai_errors()[1]:
+            response_text = self._call_llm(messages, model, temperature=0.3)
         return self._parse_with_repair(response_text, model_class, messages, model)
     
+    def submit_batch(self, requests: dict[str, list[dict]], model: Optional[str] = None) -> str:
+        """
+        Submit chat requests to the OpenAI Batch API (50% cheaper, 24h window).
+        
+        For background bulk work only (e.g. auditing a large fleet or
+        re-running intent extraction over a log); interactive requests stay
+        on _call_llm.
+        
+        Args:
+            requests: custom_id -> chat messages
+            model: Model to use (defaults to default_model)
+        
+        Returns:
+            Batch ID to pass to wait_for_batch()
+        """
+        model = model or self.default_model
+        lines = "\n".join(
+            json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {"model": model, "messages": messages},
+            })
+            for custom_id, messages in requests.items()
+        )
+        batch_file = self.client.files.create(
+            file=("batch.jsonl", io.BytesIO(lines.encode())),
+            purpose="batch"
+        )
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        return batch.id
+    
+    def wait_for_batch(
+        self,
+        batch_id: str,
+        poll_interval: float = 30.0,
+        timeout: Optional[float] = None
+    ) -> dict[str, str]:
+        """
+        Poll a batch until it finishes and return custom_id -> response text.
+        
+        Requests that failed inside the batch are omitted from the result.
+        
+        Raises:
+            RuntimeError: If the batch failed, expired or was cancelled
+            TimeoutError: If timeout (seconds) elapses first
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            if batch.status == "completed":
+                break
+            if batch.status in ("failed", "expired", "cancelled"):
+                raise RuntimeError(f"Batch {batch_id} ended with status {batch.status}")
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Batch {batch_id} still {batch.status} after {timeout}s")
+            time.sleep(poll_interval)
+        
+        results = {}
+        if batch.output_file_id:
+            output = self.client.files.content(batch.output_file_id).text
+            for line in output.splitlines():
+                record = json.loads(line)
+                response = record.get("response") or {}
+                if response.get("status_code") == 200:
+                    content = response["body"]["choices"][0]["message"]["content"]
+                    results[record["custom_id"]] = content.strip()
+        return results
+    
     def call_detect_language(self, user_message: str) -> str:
         """
         Detect the language of the user message.
         
         Returns ISO 639-1 language code (e.g., 'en', 'es', 'fr', 'nl', 'de').
+        
+        Uses the local lingua detector when available and confident (on the
+        message without names and plates); the LLM is called for short or
+        ambiguous messages.
         """
-        prompt = f"""Detect the language of the following user message and return ONLY the ISO 639-1 two-letter language code.
-
-Common codes:
-- en: English
-- es: Spanish
-- fr: French
-- nl: Dutch
-- de: German
-- it: Italian
-- pt: Portuguese
-
-User message: "{user_message}"
-
-Respond with ONLY the two-letter language code, nothing else."""
+        detector = _local_language_detector()
+        words = _strip_names(user_message)
+        if detector is not None and len(words) >= LOCAL_DETECTION_MIN_WORDS:
+            confidences = detector.compute_language_confidence_values(" ".join(words))
+            if confidences and confidences[0].value >= LOCAL_DETECTION_MIN_CONFIDENCE:
+                return confidences[0].language.iso_code_639_1.name.lower()
         
         messages = [
-            {"role": "system", "content": "You are a language detection assistant. Respond only with the ISO 639-1 language code."},
-            {"role": "user", "content": prompt}
+            {"role": "system", "content": _DETECT_LANGUAGE_SYSTEM},
+            {"role": "user", "content": f'User message: "{user_message}"'}
         ]
         
         response = self._call_llm(messages, self.default_model, temperature=0.3)
@@ -130,29 +572,38 @@ Respond with ONLY the two-letter language code, nothing else."""
             return "en"
         return lang_code
     
-    def call_translate_message(self, message: str, language: str) -> str:
+    def call_translate_message(self, message: str, language: str, **fields: str) -> str:
         """
-        Translate a simple message to the target language.
+        Translate a system message to the target language.
+        
+        Messages from translations.yaml are served from the table; others
+        are translated by the LLM once and then added to the table.
         
         Args:
-            message: The message to translate
+            message: The English message, optionally a template with
+                {placeholders} (translated as-is, filled in afterwards)
             language: ISO 639-1 language code for target language
+            **fields: Values for the template's placeholders
         
         Returns:
             Translated message
         """
         if language == "en":
-            return message
-        
-        prompt = f"""Translate the following message to the language with ISO 639-1 code: {language}
-
-Message: "{message}"
-
-Respond with ONLY the translated message, nothing else."""
-        
+            translated = message
+        else:
+            translated = translations.lookup(message, language)
+            if translated is None:
+                translated = self._translate_with_llm(message, language)
+                translations.remember(message, language, translated)
+                if fields and translations.lookup(message, language) is None:
+                    # The LLM mangled the placeholders; translate the filled-in text
+                    return self._translate_with_llm(message.format(**fields), language)
+        return translated.format(**fields) if fields else translated
+    
+    def _translate_with_llm(self, message: str, language: str) -> str:
         messages = [
-            {"role": "system", "content": "You are a translation assistant. Translate concisely and accurately."},
-            {"role": "user", "content": prompt}
+            {"role": "system", "content": _TRANSLATE_SYSTEM},
+            {"role": "user", "content": f'Target language (ISO 639-1): {language}\n\nMessage: "{message}"'}
         ]
         
         return self._call_llm(messages, self.default_model, temperature=0.3)
@@ -161,33 +612,14 @@ Respond with ONLY the translated message, nothing else."""
         """
         Extract intent and slots from user message.
         
+        The system prompt (_INTENT_SYSTEM) is the stable, cacheable prefix;
+        only the user message varies.
+        
         Returns IntentRequest with intent type and extracted slots.
         """
-        prompt = f"""You are an intent classifier for a car pollution zone eligibility service.
-
-Analyze the user's message and extract:
-1. intent: one of "single_car", "fleet", or "policy_only"
-   - single_car: user asks about ONE specific car
-   - fleet: user asks about ALL/MULTIPLE cars (e.g., "which of my cars", "are any of my cars")
-   - policy_only: user only asks about zone rules, no specific car
-
-2. car_identifier: plate number or identifying phrase (null if not mentioned or if fleet/policy_only)
-3. city: city name (null if not mentioned)
-4. zone_phrase: phrase describing the zone (e.g., "city center", "downtown", null if not mentioned)
-
-User message: "{user_message}"
-
-Respond with ONLY valid JSON matching this schema:
-{{
-  "intent": "single_car" | "fleet" | "policy_only",
-  "car_identifier": string or null,
-  "city": string or null,
-  "zone_phrase": string or null
-}}"""
-        
         messages = [
-            {"role": "system", "content": "You are a precise intent extraction assistant. Always respond with valid JSON only."},
-            {"role": "user", "content": prompt}
+            {"role": "system", "content": _INTENT_SYSTEM},
+            {"role": "user", "content": f'User message: "{user_message}"'}
         ]
         
         return self._structured_call(messages, IntentRequest)
@@ -196,7 +628,8 @@ Respond with ONLY valid JSON matching this schema:
         self, 
         kind: str,  # "car" or "zone"
         options: list[dict],
-        language: str = "en"
+        language: str = "en",
+        on_token: Optional[Callable[[str], None]] = None
     ) -> str:
         """
         Generate a natural disambiguation question.
@@ -205,6 +638,7 @@ Respond with ONLY valid JSON matching this schema:
             kind: "car" or "zone"
             options: list of dicts with keys like "label", "plate", "zone_name", etc.
             language: ISO 639-1 language code for response language
+            on_token: Optional callback receiving the question as it streams
         
         Returns:
             A short, clear question asking user to choose.
@@ -216,8 +650,7 @@ Respond with ONLY valid JSON matching this schema:
 Available cars:
 {cars_list}
 
-Respond in the language with ISO 639-1 code: {language}
-Generate ONLY the question text, no extra formatting."""
+Respond in the language with ISO 639-1 code: {language}"""
         else:  # zone
             zones_list = "\n".join([f"{i+1}. {opt['label']}" for i, opt in enumerate(options)])
             prompt = f"""Multiple pollution zones match the user's query. Generate a SHORT question (one sentence) asking them to specify which zone.
@@ -225,14 +658,15 @@ Generate ONLY the question text, no extra formatting."""
 Matching zones:
 {zones_list}
 
-Respond in the language with ISO 639-1 code: {language}
-Generate ONLY the question text, no extra formatting."""
+Respond in the language with ISO 639-1 code: {language}"""
         
         messages = [
-            {"role": "system", "content": "You are a helpful assistant. Be concise and clear."},
+            {"role": "system", "content": _DISAMBIGUATION_SYSTEM},
             {"role": "user", "content": prompt}
         ]
         
+        if on_token is not None:
+            return self._call_llm_stream(messages, self.default_model, 0.7, on_token)
         return self._call_llm(messages, self.default_model, temperature=0.7)
     
     def call_explain(
@@ -244,11 +678,15 @@ Generate ONLY the question text, no extra formatting."""
         cars: Optional[list[Car]] = None,
         policy: Optional[ZonePolicy] = None,
         zone: Optional[ZoneCandidate] = None,
-        language: str = "en"
+        language: str = "en",
+        on_token: Optional[Callable[[str], None]] = None
     ) -> str:
         """
         Generate final explanation grounded in decision and facts.
         
+        The stable prefix is _EXPLAIN_SYSTEM plus the instruction lines of
+        the intent's template; the facts and language come after it.
+        
         Args:
             intent: "single_car", "fleet", or "policy_only"
             decision: Decision object for single car
@@ -258,72 +696,75 @@ Generate ONLY the question text, no extra formatting."""
             policy: Zone policy
             zone: Zone candidate
             language: ISO 639-1 language code for response language
+            on_token: Optional callback receiving the explanation as it streams
         
         Returns:
             Clear, user-friendly explanation.
         """
-        if intent == "policy_only":
-            prompt = f"""Explain the pollution zone policy to the user in a clear, friendly way.
-
-Zone: {zone.zone_name if zone else 'Unknown'}
-City: {zone.city if zone else 'Unknown'}
-Type: {zone.zone_type if zone else 'Unknown'}
-
-Policy effective from: {policy.effective_from if policy else 'Unknown'}
-Rules:
-{chr(10).join([f"- {rule.condition}: {rule.verdict}" for rule in (policy.rules if policy else [])]) if policy else 'No rules available'}
-
-Exemptions: {', '.join(policy.exemptions) if policy and policy.exemptions else 'None'}
-
-IMPORTANT: Respond in the language with ISO 639-1 code: {language}
-Provide a 2-3 sentence summary suitable for a chatbot response.
-Then append a helpful note: mention that they can get a specific eligibility check for their vehicle by providing their car's plate number or VIN."""
-        
-        elif intent == "single_car":
-            prompt = f"""Explain the eligibility decision to the user clearly and concisely.
-
-Car: {car.plate if car else 'Unknown'} ({car.fuel_type if car and car.fuel_type else 'unknown fuel'}, {car.euro_class if car and car.euro_class else 'unknown euro class'})
-Zone: {zone.zone_name if zone else 'Unknown'}
-Allowed: {decision.allowed if decision else 'unknown'}
-Reason: {decision.reason_code if decision else 'unknown'}
-Factors: {', '.join(decision.factors) if decision and decision.factors else 'None'}
-Missing fields: {', '.join(decision.missing_fields) if decision and decision.missing_fields else 'None'}
-Next actions: {', '.join(decision.next_actions) if decision and decision.next_actions else 'None'}
-
-IMPORTANT: Respond in the language with ISO 639-1 code: {language}
-Provide a clear 2-4 sentence explanation suitable for a chatbot response. If there are missing fields or next actions, mention them."""
-        
-        else:  # fleet
-            allowed_cars = [fd for fd in fleet_decisions if fd.decision.allowed == "true"] if fleet_decisions else []
-            banned_cars = [fd for fd in fleet_decisions if fd.decision.allowed == "false"] if fleet_decisions else []
-            unknown_cars = [fd for fd in fleet_decisions if fd.decision.allowed == "unknown"] if fleet_decisions else []
+        match intent:
+            case "policy_only":
+                prompt = _policy_prompt(policy, zone, language)
             
-            prompt = f"""Summarize the fleet eligibility check for the user.
-
-Zone: {zone.zone_name if zone else 'Unknown'}
-Total cars checked: {len(fleet_decisions) if fleet_decisions else 0}
-Allowed: {len(allowed_cars)} ({', '.join([fd.plate for fd in allowed_cars]) if allowed_cars else 'none'})
-Not allowed: {len(banned_cars)} ({', '.join([fd.plate for fd in banned_cars]) if banned_cars else 'none'})
-Unknown: {len(unknown_cars)} ({', '.join([fd.plate for fd in unknown_cars]) if unknown_cars else 'none'})
-
-IMPORTANT: Respond in the language with ISO 639-1 code: {language}
-Provide a clear summary suitable for a chatbot response. List cars by category (allowed, not allowed, unknown) and mention why if relevant."""
+            case "single_car":
+                prompt = _SINGLE_CAR_PROMPT.format(
+                    plate=car.plate if car else 'Unknown',
+                    fuel=car.fuel_type if car and car.fuel_type else 'unknown fuel',
+                    euro=car.euro_class if car and car.euro_class else 'unknown euro class',
+                    zone=zone.zone_name if zone else 'Unknown',
+                    allowed=decision.allowed if decision else 'unknown',
+                    reason=decision.reason_code if decision else 'unknown',
+                    factors=_join_or_none(decision.factors if decision else None),
+                    missing=_join_or_none(decision.missing_fields if decision else None),
+                    actions=_join_or_none(decision.next_actions if decision else None),
+                    language=language
+                )
+            
+            case _:  # fleet
+                # Single pass over the decisions, grouping plates by verdict
+                plates = {"true": [], "false": [], "unknown": []}
+                for fd in fleet_decisions or ():
+                    plates[fd.decision.allowed].append(fd.plate)
+                
+                prompt = _FLEET_PROMPT.format(
+                    zone=zone.zone_name if zone else 'Unknown',
+                    total=len(fleet_decisions) if fleet_decisions else 0,
+                    n_allowed=len(plates["true"]),
+                    allowed=', '.join(plates["true"]) or 'none',
+                    n_banned=len(plates["false"]),
+                    banned=', '.join(plates["false"]) or 'none',
+                    n_unknown=len(plates["unknown"]),
+                    unknown=', '.join(plates["unknown"]) or 'none',
+                    language=language
+                )
         
         messages = [
-            {"role": "system", "content": "You are a helpful assistant explaining car pollution zone eligibility. Be clear, concise, and friendly."},
+            {"role": "system", "content": _EXPLAIN_SYSTEM},
             {"role": "user", "content": prompt}
         ]
         
-        return self._call_llm(messages, self.default_model, temperature=0.7)
+        if on_token is not None:
+            return self._call_llm_stream(messages, self.default_model, 0.7, on_token)
+        # The prompt holds every fact the explanation is grounded in, so
+        # identical facts (same car/zone/decision/language) reuse one answer
+        return self._call_llm(messages, self.default_model, temperature=0.7, cacheable=True)
 
 
 # Global instance
 _llm_client: Optional[LLMClient] = None
+_llm_client_lock = threading.Lock()
 
 
 def get_llm_client() -> LLMClient:
-    """Get or create global LLM client instance."""
+    """
+    Get or create global LLM client instance.
+    
+    Graph nodes run on worker threads, so creation is locked to guarantee
+    a single client (and a single connection pool and rate limiter);
+    after that the lock is never taken.
+    """
     global _llm_client
     if _llm_client is None:
-        _llm_client = LLMClient()
+        with _llm_client_lock:
+            if _llm_client is None:
+                _llm_client = LLMClient()
     return _llm_client
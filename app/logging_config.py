@@ -1,29 +1,55 @@
 """Structured logging configuration for traceability."""
+import atexit
 import logging
+import os
+import queue
+import random
 import sys
+import time
 from contextvars import ContextVar
-from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
 from typing import Optional
 
 # Context variable to store trace_id across async calls
 trace_id_var: ContextVar[Optional[str]] = ContextVar('trace_id', default=None)
 
+# Context variable to store the correlation_id of the current request
+correlation_id_var: ContextVar[Optional[str]] = ContextVar('correlation_id', default=None)
+
+
+# Background listener that writes queued records to the real handlers
+_listener: Optional[QueueListener] = None
+
 
 class TraceFormatter(logging.Formatter):
     """Custom formatter that includes trace_id in log messages."""
     
     def format(self, record):
-        trace_id = trace_id_var.get()
-        if trace_id:
-            record.trace_id = trace_id
-        else:
-            record.trace_id = "no-trace"
+        # Records coming through TraceQueueHandler already carry the
+        # trace_id captured on the request path
+        if not hasattr(record, "trace_id"):
+            record.trace_id = trace_id_var.get() or "no-trace"
         
         return super().format(record)
 
 
+class TraceQueueHandler(QueueHandler):
+    """QueueHandler that captures trace_id before the record leaves the request context."""
+    
+    def prepare(self, record):
+        record.trace_id = trace_id_var.get() or "no-trace"
+        return super().prepare(record)
+
+
 def setup_logging():
-    """Configure structured logging for the application."""
+    """
+    Configure structured logging for the application.
+    
+    Log calls only enqueue the record; a QueueListener thread formats and
+    writes it, so request handlers never block on stdout. Calling this
+    again replaces the previous listener.
+    """
+    global _listener
     
     # Create formatter with trace_id
     formatter = TraceFormatter(
@@ -35,13 +61,22 @@ def setup_logging():
     root_logger = logging.getLogger()
     root_logger.setLevel(logging.INFO)
     
-    # Remove existing handlers
+    # Remove existing handlers (and stop a previous listener)
     root_logger.handlers.clear()
+    if _listener is not None:
+        _listener.stop()
     
-    # Add console handler
+    # Console handler runs on the listener thread behind a queue
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(formatter)
-    root_logger.addHandler(console_handler)
+    
+    log_queue: queue.Queue = queue.Queue(-1)
+    root_logger.addHandler(TraceQueueHandler(log_queue))
+    
+    if _listener is None:
+        atexit.register(_stop_listener)
+    _listener = QueueListener(log_queue, console_handler, respect_handler_level=True)
+    _listener.start()
     
     # Set levels for specific loggers
     logging.getLogger('uvicorn').setLevel(logging.WARNING)
@@ -51,11 +86,40 @@ def setup_logging():
     return root_logger
 
 
+def _stop_listener():
+    """Flush queued records and stop the listener thread (at exit)."""
+    if _listener is not None:
+        _listener.stop()
+
+
 def get_logger(name: str) -> logging.Logger:
     """Get a logger with the given name."""
     return logging.getLogger(name)
 
 
+# Trace IDs take their random half from a per-process PRNG instead of
+# os.urandom (a syscall per request); forked workers reseed it so they
+# never share a sequence
+_id_rng = random.Random(os.urandom(16))
+
+
+def _reseed_id_rng():
+    _id_rng.seed(os.urandom(16))
+
+
+os.register_at_fork(after_in_child=_reseed_id_rng)
+
+
+def new_trace_id() -> str:
+    """
+    Return a 128-bit hex ID that sorts by creation time.
+    
+    The high 64 bits are the wall clock in nanoseconds and the low 64 are
+    random, so IDs are unique across workers and sort in log order.
+    """
+    return f"{time.time_ns() << 64 | _id_rng.getrandbits(64):032x}"
+
+
 def set_trace_id(trace_id: str):
     """Set trace_id for current context."""
     trace_id_var.set(trace_id)
@@ -64,3 +128,13 @@ def set_trace_id(trace_id: str):
 def get_trace_id() -> Optional[str]:
     """Get trace_id from current context."""
     return trace_id_var.get()
+
+
+def set_correlation_id(correlation_id: str):
+    """Set correlation_id for current context."""
+    correlation_id_var.set(correlation_id)
+
+
+def get_correlation_id() -> Optional[str]:
+    """Get correlation_id from current context."""
+    return correlation_id_var.get()
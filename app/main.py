@@ -1,12 +1,16 @@
 """FastAPI application for Agent Orchestrator service."""
-import uuid
+import asyncio
+import logging
+from typing import Optional
+import orjson
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 
 from app.models import ChatRequest, ChatAnswerRequest, ChatResponse, AgentState
 from app.state import get_session_store
-from app.graph import get_graph
-from app.logging_config import setup_logging, set_trace_id, get_trace_id, get_logger
+from app.graph import get_graph, explain_token_sink, _wrap_node, resolve_zone_node, fetch_policy_node, decide_node, explain_node
+from app.logging_config import setup_logging, set_trace_id, get_trace_id, get_logger, new_trace_id
 from app.trace_store import get_trace_store
 
 # Setup logging
@@ -16,7 +20,8 @@ logger = get_logger(__name__)
 app = FastAPI(
     title="Agent Orchestrator",
     description="Car pollution zone eligibility service",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -29,18 +34,25 @@ app.add_middleware(
 )
 
 
+# Probe endpoints get no trace_id and no request logs
+_UNTRACED_PATHS = frozenset({"/health", "/metrics"})
+
+
 @app.middleware("http")
 async def trace_id_middleware(request: Request, call_next):
     """Add trace_id to all requests for traceability."""
-    trace_id = str(uuid.uuid4())
+    if request.url.path in _UNTRACED_PATHS:
+        return await call_next(request)
+    
+    trace_id = new_trace_id()
     set_trace_id(trace_id)
     
-    logger.info(f"Incoming request: {request.method} {request.url.path}")
+    logger.info("Incoming request: %s %s", request.method, request.url.path)
     
     response = await call_next(request)
     response.headers["X-Trace-ID"] = trace_id
     
-    logger.info(f"Request completed: {request.method} {request.url.path} - Status: {response.status_code}")
+    logger.info("Request completed: %s %s - Status: %s", request.method, request.url.path, response.status_code)
     
     return response
 
@@ -59,8 +71,50 @@ async def chat(request: ChatRequest):
     
     May return a disambiguation question if multiple cars/zones match.
     """
+    return _run_chat(request, get_trace_id())
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Streaming variant of /chat (Server-Sent Events).
+    
+    The explanation is sent as ``data:`` frames (one JSON-encoded text
+    delta each) while the model generates it, followed by a ``done``
+    event carrying the same ChatResponse /chat would return. Replies
+    that are not explanations (e.g. disambiguation questions) arrive only
+    in the ``done`` event. The session is saved once the reply is complete.
+    """
+    loop = asyncio.get_running_loop()
+    tokens: asyncio.Queue = asyncio.Queue()
     trace_id = get_trace_id()
-    logger.info(f"Chat request - session: {request.session_id}, message: {request.message[:50]}...")
+    
+    def on_token(delta: str) -> None:
+        loop.call_soon_threadsafe(tokens.put_nowait, delta)
+    
+    def run() -> ChatResponse:
+        explain_token_sink.set(on_token)
+        return _run_chat(request, trace_id)
+    
+    async def events():
+        # to_thread copies the context (trace_id), so the graph runs as in /chat
+        worker = asyncio.ensure_future(asyncio.to_thread(run))
+        worker.add_done_callback(lambda _: tokens.put_nowait(None))
+        while (delta := await tokens.get()) is not None:
+            yield b"data: " + orjson.dumps(delta) + b"\n\n"
+        try:
+            response = worker.result()
+        except HTTPException as e:
+            yield b"event: error\ndata: " + orjson.dumps({"detail": e.detail}) + b"\n\n"
+            return
+        yield b"event: done\ndata: " + response.model_dump_json().encode() + b"\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+def _run_chat(request: ChatRequest, trace_id: Optional[str]) -> ChatResponse:
+    """Run the graph for one user message and persist the resulting session state."""
+    logger.info("Chat request - session: %s, message: %s...", request.session_id, request.message[:50])
     
     # Create trace
     trace_store = get_trace_store()
@@ -73,22 +127,24 @@ async def chat(request: ChatRequest):
     state = session_store.create_or_get(request.session_id, request.message)
     state.trace_id = trace_id or ""
     
-    logger.info(f"[{request.session_id}] BEFORE GRAPH - car_identifier: {state.car_identifier}, "
-               f"selected_car: {state.selected_car.plate if state.selected_car else None}")
-    
-    # Convert to dict for LangGraph
-    state_dict = state.model_dump()
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("[%s] BEFORE GRAPH - car_identifier: %s, selected_car: %s",
+                    request.session_id, state.car_identifier,
+                    state.selected_car.plate if state.selected_car else None)
     
     try:
-        logger.info(f"Starting graph execution - session: {request.session_id}")
-        # Run graph
-        result = graph.invoke(state_dict)
+        logger.info("Starting graph execution - session: %s", request.session_id)
+        # Run graph (LangGraph accepts the model instance as input; no dump needed)
+        result = graph.invoke(state)
         
-        # Convert back to AgentState
-        result_state = AgentState(**result)
+        # Convert back to AgentState. Every value was produced by a node on a
+        # validated AgentState, so skip re-validating the whole tree
+        result_state = AgentState.model_construct(**result)
         
-        logger.info(f"[{request.session_id}] AFTER GRAPH - car_identifier: {result_state.car_identifier}, "
-                   f"selected_car: {result_state.selected_car.plate if result_state.selected_car else None}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("[%s] AFTER GRAPH - car_identifier: %s, selected_car: %s",
+                        request.session_id, result_state.car_identifier,
+                        result_state.selected_car.plate if result_state.selected_car else None)
         
         # Update session store
         session_store.set(request.session_id, result_state)
@@ -96,7 +152,7 @@ async def chat(request: ChatRequest):
         # Complete trace
         trace_store.complete_trace(trace_id, result_state.reply, success=True)
         
-        logger.info(f"Graph completed - session: {request.session_id}, pending_question: {result_state.pending_question}")
+        logger.info("Graph completed - session: %s, pending_question: %s", request.session_id, result_state.pending_question)
         
         # Build response
         response = ChatResponse(
@@ -109,9 +165,9 @@ async def chat(request: ChatRequest):
         )
         
         return response
-        
+    
     except Exception as e:
-        logger.error(f"Error processing request - session: {request.session_id}, error: {str(e)}", exc_info=True)
+        logger.error("Error processing request - session: %s, error: %s", request.session_id, e, exc_info=True)
         trace_store.complete_trace(trace_id, None, success=False, error=str(e))
         raise HTTPException(status_code=500, detail=f"Error processing message: {str(e)}")
 
@@ -122,7 +178,7 @@ async def get_trace(trace_id: str):
     Get detailed trace information for a specific trace_id.
     Shows the workflow execution steps and state transitions.
     """
-    logger.info(f"Trace request - trace_id: {trace_id}")
+    logger.info("Trace request - trace_id: %s", trace_id)
     
     trace_store = get_trace_store()
     trace = trace_store.get_trace(trace_id)
@@ -133,6 +189,15 @@ async def get_trace(trace_id: str):
     return trace
 
 
+# Traced node for each next_step when resuming after a disambiguation answer
+_RESUME_NODES = {
+    "resolve_zone": _wrap_node(resolve_zone_node, "resolve_zone"),
+    "fetch_policy": _wrap_node(fetch_policy_node, "fetch_policy"),
+    "decide": _wrap_node(decide_node, "decide"),
+    "explain": _wrap_node(explain_node, "explain"),
+}
+
+
 @app.post("/chat/answer", response_model=ChatResponse)
 async def chat_answer(request: ChatAnswerRequest):
     """
@@ -141,37 +206,38 @@ async def chat_answer(request: ChatAnswerRequest):
     User selects from previously presented options.
     """
     trace_id = get_trace_id()
-    logger.info(f"Disambiguation answer - session: {request.session_id}, selection: {request.selection_index}")
+    logger.info("Disambiguation answer - session: %s, selection: %s", request.session_id, request.selection_index)
     
     # Create trace for disambiguation answer
     trace_store = get_trace_store()
     trace_store.create_trace(trace_id, request.session_id)
     
     session_store = get_session_store()
-    graph = get_graph()
     
     # Get existing session
     state = session_store.get(request.session_id)
     
     if not state:
-        logger.warning(f"Session not found: {request.session_id}")
+        logger.warning("Session not found: %s", request.session_id)
         raise HTTPException(status_code=404, detail="Session not found")
     
-    logger.info(f"[{request.session_id}] DISAMBIGUATION ANSWER - car_identifier: {state.car_identifier}, "
-               f"selected_car: {state.selected_car.plate if state.selected_car else None}")
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("[%s] DISAMBIGUATION ANSWER - car_identifier: %s, selected_car: %s",
+                    request.session_id, state.car_identifier,
+                    state.selected_car.plate if state.selected_car else None)
     
     if not state.pending_question:
-        logger.warning(f"No pending question for session: {request.session_id}")
+        logger.warning("No pending question for session: %s", request.session_id)
         raise HTTPException(status_code=400, detail="No pending question for this session")
     
     # Validate selection
     if request.selection_index < 0 or request.selection_index >= len(state.disambiguation_options):
-        logger.warning(f"Invalid selection index: {request.selection_index} for session: {request.session_id}")
+        logger.warning("Invalid selection index: %s for session: %s", request.selection_index, request.session_id)
         raise HTTPException(status_code=400, detail="Invalid selection index")
     
     # Apply selection
     selected_option = state.disambiguation_options[request.selection_index]
-    logger.info(f"Selected option: {selected_option.get('label')} for session: {request.session_id}")
+    logger.info("Selected option: %s for session: %s", selected_option.get('label'), request.session_id)
     
     if state.pending_type == "car":
         # Find and set selected car
@@ -213,76 +279,17 @@ async def chat_answer(request: ChatAnswerRequest):
         else:
             state.next_step = "decide"
     
-    # Convert to dict for LangGraph
-    state_dict = state.model_dump()
-    
     try:
         # Continue from the appropriate node
-        # We manually invoke nodes and capture traces
-        logger.info(f"Continuing from: {state.next_step} for session: {request.session_id}")
+        # We manually invoke nodes (on the same state object) and capture traces
+        logger.info("Continuing from: %s for session: %s", state.next_step, request.session_id)
         
-        if state.next_step == "resolve_zone":
-            from app.graph import _wrap_node, resolve_zone_node, fetch_policy_node, decide_node, explain_node
-            
-            state_result = _wrap_node(resolve_zone_node, "resolve_zone")(AgentState(**state_dict))
-            state_dict = state_result.model_dump()
-            
-            # If zone disambiguation is needed, stop here
-            if state_result.pending_question:
-                logger.info(f"Additional disambiguation needed for session: {request.session_id}")
-                session_store.set(request.session_id, state_result)
-                trace_store.complete_trace(trace_id, state_result.reply, success=True)
-                return ChatResponse(
-                    session_id=request.session_id,
-                    reply=state_result.reply,
-                    pending_question=state_result.pending_question,
-                    options=state_result.disambiguation_options,
-                    state=None,
-                    trace_id=trace_id
-                )
-            
-            # Continue to fetch_policy
-            if state_result.next_step == "fetch_policy":
-                state_result = _wrap_node(fetch_policy_node, "fetch_policy")(AgentState(**state_dict))
-                state_dict = state_result.model_dump()
-            
-            if state_result.next_step == "decide":
-                state_result = _wrap_node(decide_node, "decide")(AgentState(**state_dict))
-                state_dict = state_result.model_dump()
-            
-            if state_result.next_step == "explain":
-                state_result = _wrap_node(explain_node, "explain")(AgentState(**state_dict))
-                state_dict = state_result.model_dump()
-            
-            result_state = state_result
-        elif state.next_step == "fetch_policy":
-            from app.graph import _wrap_node, fetch_policy_node, decide_node, explain_node
-            
-            state_result = _wrap_node(fetch_policy_node, "fetch_policy")(AgentState(**state_dict))
-            state_dict = state_result.model_dump()
-            
-            if state_result.next_step == "decide":
-                state_result = _wrap_node(decide_node, "decide")(AgentState(**state_dict))
-                state_dict = state_result.model_dump()
-            
-            if state_result.next_step == "explain":
-                state_result = _wrap_node(explain_node, "explain")(AgentState(**state_dict))
-                state_dict = state_result.model_dump()
-            
-            result_state = state_result
-        elif state.next_step == "decide":
-            from app.graph import _wrap_node, decide_node, explain_node
-            
-            state_result = _wrap_node(decide_node, "decide")(AgentState(**state_dict))
-            state_dict = state_result.model_dump()
-            
-            if state_result.next_step == "explain":
-                state_result = _wrap_node(explain_node, "explain")(AgentState(**state_dict))
-                state_dict = state_result.model_dump()
-            
-            result_state = state_result
-        else:
-            result_state = AgentState(**state_dict)
+        result_state = state
+        while result_state.next_step in _RESUME_NODES and not result_state.pending_question:
+            result_state = _RESUME_NODES[result_state.next_step](result_state)
+        
+        if result_state.pending_question:
+            logger.info("Additional disambiguation needed for session: %s", request.session_id)
         
         # Update session store
         session_store.set(request.session_id, result_state)
@@ -290,7 +297,7 @@ async def chat_answer(request: ChatAnswerRequest):
         # Complete trace
         trace_store.complete_trace(trace_id, result_state.reply, success=True)
         
-        logger.info(f"Disambiguation resolved - session: {request.session_id}, final reply length: {len(result_state.reply)}")
+        logger.info("Disambiguation resolved - session: %s, final reply length: %s", request.session_id, len(result_state.reply))
         
         # Build response
         response = ChatResponse(
@@ -303,13 +310,14 @@ async def chat_answer(request: ChatAnswerRequest):
         )
         
         return response
-        
+    
     except Exception as e:
-        logger.error(f"Error processing disambiguation answer - session: {request.session_id}, error: {str(e)}", exc_info=True)
+        logger.error("Error processing disambiguation answer - session: %s, error: %s", request.session_id, e, exc_info=True)
         trace_store.complete_trace(trace_id, None, success=False, error=str(e))
         raise HTTPException(status_code=500, detail=f"Error processing answer: {str(e)}")
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # trace_id_middleware already logs every request, so uvicorn's access log is off
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop="uvloop", http="httptools", access_log=False)
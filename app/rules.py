@@ -1,6 +1,6 @@
 """Deterministic eligibility decision logic."""
 from datetime import date
-from typing import Optional
+from typing import Optional, Sequence
 from app.models import Car, ZonePolicy, Decision
 
 
@@ -53,10 +53,14 @@ def decide_eligibility(
     banned = False
     matching_rules = []
     
+    # Lowercase the car's fields once rather than per rule
+    fuel = car.fuel_type.lower() if car.fuel_type else None
+    euro = car.euro_class.lower() if car.euro_class else None
+    
     for rule in policy.rules:
         if rule.verdict == "banned":
             # Check if rule applies to this car
-            applies = _rule_applies(car, rule)
+            applies = _rule_applies(car, rule, fuel, euro)
             if applies:
                 matching_rules.append(rule)
                 factors.append(f"Matches rule: {rule.condition}")
@@ -84,36 +88,74 @@ def decide_eligibility(
     )
 
 
-def _rule_applies(car: Car, rule) -> bool:
-    """Check if a policy rule applies to a given car."""
-    applies_to = rule.applies_to
+def decide_fleet(
+    cars: Sequence[Car],
+    policy: ZonePolicy,
+    check_date: Optional[date] = None
+) -> list[Decision]:
+    """
+    Decide eligibility for every car in a fleet, in input order.
+    
+    A decision depends only on the car's (fuel_type, vehicle_category,
+    euro_class) profile, and fleets are mostly a handful of models bought
+    in bulk, so the rules are evaluated once per distinct profile and
+    cars sharing a profile share the Decision object (treat it as
+    read-only). Cars with missing data are decided individually, since
+    their next_actions name the plate.
+    
+    Runs in-process: pickling cars and decisions for a worker pool costs
+    about as much as the decisions themselves (and threads cannot help
+    under the GIL).
+    """
+    if check_date is None:
+        check_date = date.today()
+    
+    by_profile: dict[tuple, Decision] = {}
+    decisions = []
+    for car in cars:
+        profile = (car.fuel_type, car.vehicle_category, car.euro_class)
+        decision = by_profile.get(profile)
+        if decision is None:
+            decision = decide_eligibility(car, policy, check_date)
+            if decision.reason_code != "MISSING_VEHICLE_DATA":
+                by_profile[profile] = decision
+        decisions.append(decision)
+    return decisions
+
+
+def _rule_applies(car: Car, rule, fuel: Optional[str], euro: Optional[str]) -> bool:
+    """
+    Check if a policy rule applies to a given car.
+    
+    fuel/euro are the car's fuel_type/euro_class, already lowercased;
+    rule tokens are matched against the rule's precomputed lowercase set.
+    """
+    tokens = rule.applies_to_lower
     
     # Check fuel type
-    if car.fuel_type and car.fuel_type.lower() in [a.lower() for a in applies_to]:
+    if fuel and fuel in tokens:
         # Check vehicle category
-        if car.vehicle_category and car.vehicle_category in applies_to:
+        if car.vehicle_category and car.vehicle_category in rule.applies_to:
             # Check euro class
-            if car.euro_class and car.euro_class.lower() in [a.lower() for a in applies_to]:
+            if euro and euro in tokens:
                 return True
             # If no euro class specified in rule, just fuel + category match
-            if not any(a.lower().startswith("euro") for a in applies_to):
+            if not rule.has_euro_token:
                 return True
     
     # Special case: N1 non-electric rule (for ZEZ)
-    if "N1" in applies_to and "non_electric" in applies_to:
-        if car.vehicle_category == "N1" and car.fuel_type and car.fuel_type.lower() != "electric":
+    if rule.is_n1_non_electric:
+        if car.vehicle_category == "N1" and fuel and fuel != "electric":
             return True
     
     # Check if euro class alone matches (for broader bans)
-    if car.euro_class:
-        euro_lower = car.euro_class.lower()
-        if euro_lower in [a.lower() for a in applies_to]:
-            # Check fuel type match too
-            if car.fuel_type and car.fuel_type.lower() in [a.lower() for a in applies_to]:
+    if euro and euro in tokens:
+        # Check fuel type match too
+        if fuel and fuel in tokens:
+            return True
+        # Euro3 and below might ban all fuels
+        if euro in ("euro3", "euro2", "euro1", "euro0"):
+            if "diesel" in tokens and fuel == "diesel":
                 return True
-            # Euro3 and below might ban all fuels
-            if euro_lower in ["euro3", "euro2", "euro1", "euro0"]:
-                if "diesel" in [a.lower() for a in applies_to] and car.fuel_type and car.fuel_type.lower() == "diesel":
-                    return True
     
     return False
@@ -1,79 +1,197 @@
-"""In-memory session state management."""
-from typing import Dict, Optional
+"""Session state management (in-memory, or Redis for multi-worker deployments)."""
+import logging
+import os
+import threading
+from typing import Dict, List, Optional
+import orjson
 from app.models import AgentState
 from app.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# Number of independently locked shards in the in-memory store (power of two)
+_SHARDS = 16
 
-class SessionStore:
-    """Simple in-memory store for session states."""
+
+def _reset_for_new_turn(state: AgentState, message: str) -> AgentState:
+    """
+    Prepare a stored session state for a new user message.
+    
+    Language and car context (selected_car, car_identifier) carry over
+    from the previous turn; the new message may override them later.
+    """
+    session_id = state.session_id
+    
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("[%s] STATE RESTORE - Previous car_identifier: %s, selected_car: %s",
+                    session_id, state.car_identifier,
+                    state.selected_car.plate if state.selected_car else None)
+    
+    state.message = message
+    state.reply = ""
+    state.pending_question = False
+    state.disambiguation_options = []
+    # Keep the language if it was already detected
+    state.language = state.language or "en"
+    
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("[%s] STATE AFTER RESET - car_identifier: %s, selected_car: %s, language: %s",
+                    session_id, state.car_identifier,
+                    state.selected_car.plate if state.selected_car else None, state.language)
+    
+    return state
+
+
+def _log_save(session_id: str, state: AgentState) -> None:
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("[%s] STATE SAVE - car_identifier: %s, selected_car: %s, intent: %s, city: %s",
+                    session_id, state.car_identifier,
+                    state.selected_car.plate if state.selected_car else None, state.intent, state.city)
+
+
+class LocalSessionStore:
+    """
+    Simple in-memory store for session states (single worker / development).
+    
+    Sessions are spread over ``_SHARDS`` dicts, each with its own lock, so
+    concurrent requests only wait on each other when their session IDs
+    land in the same shard.
+    """
     
     def __init__(self):
-        self._sessions: Dict[str, AgentState] = {}
+        self._shards: List[Dict[str, AgentState]] = [{} for _ in range(_SHARDS)]
+        self._locks = [threading.Lock() for _ in range(_SHARDS)]
     
     def get(self, session_id: str) -> Optional[AgentState]:
         """Get session state by ID."""
-        return self._sessions.get(session_id)
+        i = hash(session_id) & (_SHARDS - 1)
+        with self._locks[i]:
+            return self._shards[i].get(session_id)
     
     def set(self, session_id: str, state: AgentState) -> None:
         """Store or update session state."""
-        logger.info(f"[{session_id}] STATE SAVE - car_identifier: {state.car_identifier}, "
-                   f"selected_car: {state.selected_car.plate if state.selected_car else None}, "
-                   f"intent: {state.intent}, city: {state.city}")
-        self._sessions[session_id] = state
+        _log_save(session_id, state)
+        i = hash(session_id) & (_SHARDS - 1)
+        with self._locks[i]:
+            self._shards[i][session_id] = state
     
     def delete(self, session_id: str) -> None:
         """Delete a session."""
-        if session_id in self._sessions:
-            del self._sessions[session_id]
+        i = hash(session_id) & (_SHARDS - 1)
+        with self._locks[i]:
+            self._shards[i].pop(session_id, None)
     
     def create_or_get(self, session_id: str, message: str = "") -> AgentState:
         """Get existing session or create new one."""
-        if session_id in self._sessions:
-            # Update message and reset for new turn
-            state = self._sessions[session_id]
-            # Preserve language from previous turn
-            previous_language = state.language
-            # Preserve car context (selected_car and car_identifier) across turns
-            previous_selected_car = state.selected_car
-            previous_car_identifier = state.car_identifier
-            
-            logger.info(f"[{session_id}] STATE RESTORE - Previous car_identifier: {previous_car_identifier}, "
-                       f"selected_car: {previous_selected_car.plate if previous_selected_car else None}")
-            
-            state.message = message
-            state.reply = ""
-            state.pending_question = False
-            state.disambiguation_options = []
-            # Keep the language if it was already detected
-            if not previous_language:
-                previous_language = "en"
-            state.language = previous_language
-            # Preserve car context unless it will be explicitly overridden by new message
-            state.selected_car = previous_selected_car
-            state.car_identifier = previous_car_identifier
-            
-            logger.info(f"[{session_id}] STATE AFTER RESET - car_identifier: {state.car_identifier}, "
-                       f"selected_car: {state.selected_car.plate if state.selected_car else None}, "
-                       f"language: {state.language}")
-            
-            return state
-        else:
-            # Create new session
-            logger.info(f"[{session_id}] Creating NEW SESSION")
-            state = AgentState(session_id=session_id, message=message)
-            self._sessions[session_id] = state
+        i = hash(session_id) & (_SHARDS - 1)
+        # Lookup and insert under one lock, so two concurrent first requests
+        # for a session share a single state
+        with self._locks[i]:
+            shard = self._shards[i]
+            state = shard.get(session_id)
+            created = state is None
+            if created:
+                state = AgentState(session_id=session_id, message=message)
+                shard[session_id] = state
+        
+        if created:
+            logger.info("[%s] Creating NEW SESSION", session_id)
             return state
+        
+        # Update message and reset for new turn (the stored object is
+        # updated in place)
+        return _reset_for_new_turn(state, message)
+
 
+# Backwards-compatible name
+SessionStore = LocalSessionStore
 
-# Global session store instance
-_session_store: Optional[SessionStore] = None
+
+class RedisSessionStore:
+    """
+    Redis-backed session store, shared by all workers.
+    
+    States are stored as JSON under ``sess:<session_id>`` and expire after
+    ``ttl`` seconds without a write. Returned states are copies: callers
+    must set() them after changing them (the endpoints already do).
+    """
+    
+    def __init__(self, url: str, ttl: int = 1800, max_connections: int = 50):
+        import redis  # only needed when SESSION_STORE=redis
+        
+        pool = redis.ConnectionPool.from_url(url, max_connections=max_connections)
+        self._r = redis.Redis(connection_pool=pool)
+        self.ttl = ttl
+    
+    @staticmethod
+    def _key(session_id: str) -> str:
+        return f"sess:{session_id}"
+    
+    @staticmethod
+    def _load(raw: bytes) -> AgentState:
+        # orjson.loads + model_validate is ~1.5x faster than model_validate_json
+        # on a populated state; writes keep Pydantic's (Rust) model_dump_json,
+        # which beats orjson.dumps(model_dump(mode="json"))
+        return AgentState.model_validate(orjson.loads(raw))
+    
+    def get(self, session_id: str) -> Optional[AgentState]:
+        """Get session state by ID."""
+        raw = self._r.get(self._key(session_id))
+        return self._load(raw) if raw is not None else None
+    
+    def set(self, session_id: str, state: AgentState) -> None:
+        """Store or update session state (refreshes the TTL)."""
+        _log_save(session_id, state)
+        self._r.setex(self._key(session_id), self.ttl, state.model_dump_json())
+    
+    def delete(self, session_id: str) -> None:
+        """Delete a session."""
+        self._r.delete(self._key(session_id))
+    
+    def create_or_get(self, session_id: str, message: str = "") -> AgentState:
+        """Get existing session or create new one."""
+        new_state = AgentState(session_id=session_id, message=message)
+        # SET NX + GET in one round trip: if two workers race on a new
+        # session, both end up with whichever state was stored first
+        pipe = self._r.pipeline()
+        pipe.set(self._key(session_id), new_state.model_dump_json(), ex=self.ttl, nx=True)
+        pipe.get(self._key(session_id))
+        created, raw = pipe.execute()
+        
+        if created:
+            logger.info("[%s] Creating NEW SESSION", session_id)
+            return new_state
+        return _reset_for_new_turn(self._load(raw), message)
+
+
+def _create_session_store() -> LocalSessionStore | RedisSessionStore:
+    """
+    Build the session store selected by the environment.
+    
+    SESSION_STORE=redis (with REDIS_URL) selects the Redis store, which
+    is required when running more than one worker; the default is the
+    in-memory store. The Redis client only connects on first use.
+    """
+    if os.getenv("SESSION_STORE", "local") == "redis":
+        return RedisSessionStore(
+            os.getenv("REDIS_URL", "redis://localhost:6379/0"),
+            ttl=int(os.getenv("SESSION_TTL_SECONDS", "1800"))
+        )
+    return LocalSessionStore()
+
+
+# Global session store instance, created at import so the per-request
+# accessor is a plain lookup
+_session_store = _create_session_store()
+
+
+def get_session_store() -> LocalSessionStore | RedisSessionStore:
+    """Get the global session store."""
+    return _session_store
 
 
-def get_session_store() -> SessionStore:
-    """Get or create global session store."""
+def reset_session_store() -> LocalSessionStore | RedisSessionStore:
+    """Replace the global session store with a fresh one (for tests)."""
     global _session_store
-    if _session_store is None:
-        _session_store = SessionStore()
+    _session_store = _create_session_store()
     return _session_store
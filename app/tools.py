@@ -1,13 +1,17 @@
 """Mock services for car info and city policy (in-memory stubs)."""
+import re
+import threading
 from datetime import date
-from typing import Optional
-from app.models import Car, ZoneCandidate, ZonePolicy, ZonePolicyRule
+from typing import Optional, Sequence
+from cachetools import TTLCache, cached
+from app.models import Car, IntentRequest, ZoneCandidate, ZonePolicy, ZonePolicyRule
 
 
 # ========== Mock Data ==========
+# Reference data is built from frozen models and shared by all requests
 
 MOCK_CARS = {
-    "session_default": [
+    "session_default": (
         Car(
             car_id="car_001",
             plate="AB-123-CD",
@@ -40,7 +44,7 @@ MOCK_CARS = {
             first_reg_date=date(2018, 11, 5),
             vehicle_category="N1"
         ),
-    ]
+    )
 }
 
 MOCK_ZONES = {
@@ -74,59 +78,94 @@ MOCK_POLICIES = {
         zone_id="ams_lez_01",
         zone_name="Amsterdam City Center LEZ",
         effective_from=date(2020, 1, 1),
-        rules=[
+        rules=(
             ZonePolicyRule(
                 condition="Diesel passenger cars (M1) with Euro class 4 or lower",
                 verdict="banned",
-                applies_to=["diesel", "euro4", "M1"]
+                applies_to=frozenset({"diesel", "euro4", "M1"})
             ),
             ZonePolicyRule(
                 condition="Diesel passenger cars (M1) with Euro class 3 or lower",
                 verdict="banned",
-                applies_to=["diesel", "euro3", "M1"]
+                applies_to=frozenset({"diesel", "euro3", "M1"})
             ),
-        ],
-        exemptions=["vintage_cars", "disabled_permit"]
+        ),
+        exemptions=("vintage_cars", "disabled_permit")
     ),
     "ams_zez_01": ZonePolicy(
         city="Amsterdam",
         zone_id="ams_zez_01",
         zone_name="Amsterdam Logistics ZEZ",
         effective_from=date(2025, 1, 1),
-        rules=[
+        rules=(
             ZonePolicyRule(
                 condition="Light commercial vehicles (N1) must be zero-emission (BEV)",
                 verdict="banned",
-                applies_to=["N1", "non_electric"]
+                applies_to=frozenset({"N1", "non_electric"})
             ),
-        ],
-        exemptions=[]
+        ),
+        exemptions=()
     ),
     "rtd_lez_01": ZonePolicy(
         city="Rotterdam",
         zone_id="rtd_lez_01",
         zone_name="Rotterdam Environmental Zone",
         effective_from=date(2019, 6, 1),
-        rules=[
+        rules=(
             ZonePolicyRule(
                 condition="Diesel vehicles with Euro class 3 or lower",
                 verdict="banned",
-                applies_to=["diesel", "euro3"]
+                applies_to=frozenset({"diesel", "euro3"})
             ),
-        ],
-        exemptions=["emergency_vehicles"]
+        ),
+        exemptions=("emergency_vehicles",)
     ),
 }
 
 
+# Separators ignored when comparing plates ("AB-123-CD" == "ab 123cd")
+_PLATE_STRIP = str.maketrans("", "", "- ")
+
+
+def _normalize_plate(plate: str) -> str:
+    """Lowercase a plate and drop dashes/spaces."""
+    return plate.lower().translate(_PLATE_STRIP)
+
+
+# Normalized plates of the static mock fleet, computed once at import
+_NORMALIZED_PLATES = {
+    car.plate: _normalize_plate(car.plate)
+    for cars in MOCK_CARS.values()
+    for car in cars
+}
+
+# Exact-plate index per fleet returned by list_user_cars. Fleets are the
+# module-level MOCK_CARS tuples, which live as long as the process, so
+# their id() is a stable key; any other car list simply has no index.
+_PLATE_INDEX = {
+    id(cars): {_NORMALIZED_PLATES[car.plate]: car for car in cars}
+    for cars in MOCK_CARS.values()
+}
+
+
 # ========== Mock Service Functions ==========
 
-def list_user_cars(session_id: str) -> list[Car]:
-    """Return list of cars for a user/session."""
+def list_user_cars(session_id: str) -> tuple[Car, ...]:
+    """Return the (immutable) cars for a user/session."""
     # For PoC, all sessions get the same default car list
-    return MOCK_CARS.get(session_id, MOCK_CARS["session_default"])
+    return MOCK_CARS.get(session_id) or MOCK_CARS["session_default"]
+
+
+# Zone taxonomy and policies change at most daily, so lookups are cached
+# for an hour (shared across requests; callers must not mutate results)
+REFERENCE_DATA_TTL_SECONDS = 3600
 
 
+def _zone_key(city: str, zone_phrase: Optional[str] = None) -> tuple[str, str]:
+    return city.lower(), (zone_phrase or "").lower()
+
+
+@cached(TTLCache(maxsize=256, ttl=REFERENCE_DATA_TTL_SECONDS), key=_zone_key, lock=threading.Lock())
 def resolve_zone(city: str, zone_phrase: Optional[str] = None) -> list[ZoneCandidate]:
     """
     Resolve city + optional zone phrase to zone candidates.
@@ -153,22 +192,108 @@ def resolve_zone(city: str, zone_phrase: Optional[str] = None) -> list[ZoneCandi
     return candidates
 
 
+@cached(TTLCache(maxsize=256, ttl=REFERENCE_DATA_TTL_SECONDS), lock=threading.Lock())
 def get_policy(zone_id: str) -> Optional[ZonePolicy]:
     """Get policy for a specific zone."""
     return MOCK_POLICIES.get(zone_id)
 
 
+# Known city names as whole words, for guessing the city before the LLM has run
+_CITY_PATTERN = re.compile(r"\b(" + "|".join(map(re.escape, MOCK_ZONES)) + r")\b", re.IGNORECASE)
+
+
+def guess_city(message: str) -> Optional[str]:
+    """Cheap guess at the city a message mentions (None if no known city appears)."""
+    match = _CITY_PATTERN.search(message)
+    return match.group(1) if match else None
+
+
+# Deterministic intent patterns, tried before the LLM. Each one is narrow:
+# anything ambiguous (two plates, a zone qualifier, a fleet question naming
+# a plate, ...) is left to the LLM.
+_PLATE_PATTERN = re.compile(r"\b(?=[A-Z0-9-]*\d)[A-Z0-9]{1,3}-[A-Z0-9]{1,3}-[A-Z0-9]{1,3}\b", re.IGNORECASE)
+_FLEET_PATTERN = re.compile(
+    r"\b(?:(?:all|any|which|each) of my (?:cars|vehicles)|all my (?:cars|vehicles)|my (?:fleet|cars|vehicles))\b",
+    re.IGNORECASE
+)
+_POLICY_PATTERN = re.compile(r"\b(?:rules|policy|policies|regulations|restrictions)\b", re.IGNORECASE)
+_OWN_CAR_PATTERN = re.compile(r"\b(?:my|mine)\b", re.IGNORECASE)
+# Phrases resolve_zone narrows on; with none of them any zone phrase
+# resolves to all of the city's zones, so only center/downtown are kept
+_ZONE_QUALIFIER_PATTERN = re.compile(r"logistic|cargo|emission|\b(?:zez|lez)\b", re.IGNORECASE)
+_ZONE_PHRASE_PATTERN = re.compile(r"\b(?:city\s+)?cent(?:er|re)\b|\bdowntown\b", re.IGNORECASE)
+
+
+def _is_fleet_plate(cars: Sequence[Car], plate: str) -> bool:
+    """Whether plate is exactly (ignoring case and separators) one of the cars' plates."""
+    normalized = _normalize_plate(plate)
+    index = _PLATE_INDEX.get(id(cars))
+    if index is not None:
+        return normalized in index
+    return any(_normalize_plate(car.plate) == normalized for car in cars)
+
+
+def quick_intent(message: str, cars: Sequence[Car]) -> Optional[IntentRequest]:
+    """
+    Classify common message shapes without the LLM.
+    
+    Returns None (use the LLM) unless the message names a known city and
+    is unambiguously about one of the user's ``cars`` (by its plate), the
+    user's whole fleet, or the zone's rules.
+    """
+    city = guess_city(message)
+    if not city or _ZONE_QUALIFIER_PATTERN.search(message):
+        return None
+    city = MOCK_ZONES[city.lower()][0].city  # canonical spelling
+    zone_match = _ZONE_PHRASE_PATTERN.search(message)
+    zone_phrase = zone_match.group(0).lower() if zone_match else None
+    
+    plates = _PLATE_PATTERN.findall(message)
+    is_fleet = _FLEET_PATTERN.search(message) is not None
+    
+    if len(plates) == 1 and not is_fleet:
+        # Plate-shaped tokens that aren't one of the user's plates (dates
+        # such as 12-01-24, typos) are left to the LLM
+        if not _is_fleet_plate(cars, plates[0]):
+            return None
+        return IntentRequest(intent="single_car", car_identifier=plates[0].upper(), city=city, zone_phrase=zone_phrase)
+    if plates:
+        return None
+    if is_fleet:
+        return IntentRequest(intent="fleet", city=city, zone_phrase=zone_phrase)
+    if _POLICY_PATTERN.search(message) and not _OWN_CAR_PATTERN.search(message):
+        return IntentRequest(intent="policy_only", city=city, zone_phrase=zone_phrase)
+    return None
+
+
+def prewarm_policies() -> int:
+    """Load every known zone's policy into the cache (run at startup); returns the count."""
+    zone_ids = {zone.zone_id for zones in MOCK_ZONES.values() for zone in zones}
+    for zone_id in zone_ids:
+        get_policy(zone_id)
+    return len(zone_ids)
+
+
 def find_car_by_identifier(cars: list[Car], identifier: str) -> list[Car]:
     """
     Find cars matching an identifier (plate number or partial match).
     Returns list of matching cars.
     """
-    identifier_lower = identifier.lower().replace("-", "").replace(" ", "")
+    identifier_normalized = _normalize_plate(identifier)
+    
+    # A full plate typed exactly is one O(1) lookup; partial identifiers
+    # fall through to the substring scan
+    index = _PLATE_INDEX.get(id(cars))
+    if index is not None and identifier_normalized in index:
+        return [index[identifier_normalized]]
+    
     matches = []
     
     for car in cars:
-        plate_normalized = car.plate.lower().replace("-", "").replace(" ", "")
-        if identifier_lower in plate_normalized or plate_normalized in identifier_lower:
+        plate_normalized = _NORMALIZED_PLATES.get(car.plate)
+        if plate_normalized is None:
+            plate_normalized = _normalize_plate(car.plate)
+        if identifier_normalized in plate_normalized or plate_normalized in identifier_normalized:
             matches.append(car)
     
     return matches
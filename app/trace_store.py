@@ -1,19 +1,66 @@
 """In-memory trace storage for workflow execution tracking."""
-from typing import Dict, List, Optional, Any
+import threading
+from collections import deque
+from dataclasses import dataclass, replace
+from itertools import islice
+from time import perf_counter_ns
+from typing import Deque, Dict, List, Optional, Any
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field, PrivateAttr
 from app.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# Values stored in a trace as-is
+_PRIMITIVES = (str, int, float, bool, type(None))
 
-class TraceStep(BaseModel):
-    """A single step in the workflow execution."""
+# Steps kept per trace; older steps are dropped if a run loops
+MAX_TRACE_STEPS = 256
+
+# Number of independently locked shards in the store (power of two)
+_SHARDS = 16
+
+# Field-name tuples shared by all snapshots with the same fields
+_KEYSETS: Dict[tuple, tuple] = {}
+
+
+class _StateSnapshot:
+    """
+    Compact copy of a state dict: a values tuple plus a field-name tuple
+    shared with every other snapshot of the same state type.
+    
+    Takes ~300 bytes instead of ~460 for an AgentState dict, which adds up
+    over the thousands of steps the store keeps.
+    """
+    __slots__ = ("keys", "values")
+    
+    def __init__(self, state: Dict[str, Any]):
+        keys = tuple(state)
+        self.keys = _KEYSETS.setdefault(keys, keys)
+        self.values = tuple(state.values())
+    
+    def items(self):
+        return zip(self.keys, self.values)
+
+
+@dataclass(slots=True)
+class TraceStep:
+    """
+    A single step in the workflow execution.
+    
+    A slotted dataclass rather than a model: steps are only built by the
+    store, so they skip validation and the per-instance __dict__ and
+    fields-set bookkeeping. WorkflowTrace still serializes them as objects.
+    """
+    # Lets pydantic build WorkflowTrace's schema around _StateSnapshot
+    __pydantic_config__ = ConfigDict(arbitrary_types_allowed=True)
+    
     step_number: int
     node_name: str
     timestamp: datetime
-    input_state: Dict[str, Any]
-    output_state: Dict[str, Any]
+    # A _StateSnapshot while stored; get_trace returns sanitized dicts
+    input_state: Dict[str, Any] | _StateSnapshot
+    output_state: Dict[str, Any] | _StateSnapshot
     duration_ms: float
 
 
@@ -24,18 +71,36 @@ class WorkflowTrace(BaseModel):
     started_at: datetime
     completed_at: Optional[datetime] = None
     total_duration_ms: Optional[float] = None
-    steps: List[TraceStep] = []
+    steps: Deque[TraceStep] = Field(default_factory=lambda: deque(maxlen=MAX_TRACE_STEPS))
     final_reply: Optional[str] = None
     success: bool = True
     error: Optional[str] = None
+    
+    # Monotonic start time for total_duration_ms (started_at is for display
+    # and can jump with the wall clock)
+    _started_ns: int = PrivateAttr(default_factory=perf_counter_ns)
 
 
 class TraceStore:
-    """In-memory store for execution traces."""
+    """
+    In-memory store for execution traces.
+    
+    Traces are spread over ``_SHARDS`` dicts, each with its own lock, so
+    concurrent requests only wait on each other when their trace IDs land
+    in the same shard. Each shard keeps at most its share of
+    ``max_traces`` and evicts its own oldest trace.
+    """
     
     def __init__(self, max_traces: int = 1000):
-        self._traces: Dict[str, WorkflowTrace] = {}
+        self._shards: List[Dict[str, WorkflowTrace]] = [{} for _ in range(_SHARDS)]
+        self._locks = [threading.Lock() for _ in range(_SHARDS)]
         self._max_traces = max_traces
+        self._max_per_shard = max(1, max_traces // _SHARDS)
+    
+    def _lookup(self, trace_id: str) -> Optional[WorkflowTrace]:
+        i = hash(trace_id) & (_SHARDS - 1)
+        with self._locks[i]:
+            return self._shards[i].get(trace_id)
     
     def create_trace(self, trace_id: str, session_id: str) -> WorkflowTrace:
         """Create a new trace."""
@@ -45,88 +110,151 @@ class TraceStore:
             started_at=datetime.now()
         )
         
-        # Clean up old traces if we exceed max
-        if len(self._traces) >= self._max_traces:
-            # Remove oldest trace
-            oldest_id = min(self._traces.keys(), 
-                          key=lambda k: self._traces[k].started_at)
-            del self._traces[oldest_id]
-            logger.info(f"Removed oldest trace: {oldest_id}")
+        i = hash(trace_id) & (_SHARDS - 1)
+        with self._locks[i]:
+            shard = self._shards[i]
+            # Dict order is creation order (a re-created ID moves to the end),
+            # so the shard's oldest trace is always its first key
+            shard.pop(trace_id, None)
+            
+            # Clean up old traces if the shard is full
+            oldest_id = None
+            if len(shard) >= self._max_per_shard:
+                oldest_id = next(iter(shard))
+                del shard[oldest_id]
+            
+            shard[trace_id] = trace
         
-        self._traces[trace_id] = trace
-        logger.info(f"Created trace: {trace_id}")
+        if oldest_id is not None:
+            logger.debug("Removed oldest trace: %s", oldest_id)
+        logger.info("Created trace: %s", trace_id)
         return trace
     
     def add_step(self, trace_id: str, node_name: str, 
                  input_state: Dict[str, Any], output_state: Dict[str, Any],
                  duration_ms: float):
         """Add a step to an existing trace."""
-        if trace_id not in self._traces:
-            logger.warning(f"Trace not found: {trace_id}")
+        # Steps of one trace come from the request that owns it, so only the
+        # lookup needs the shard lock
+        trace = self._lookup(trace_id)
+        if trace is None:
+            logger.warning("Trace not found: %s", trace_id)
             return
         
-        trace = self._traces[trace_id]
+        # Stored steps hold _StateSnapshot objects; get_trace expands them
+        # back into dicts
+        steps = trace.steps
         step = TraceStep(
-            step_number=len(trace.steps) + 1,
+            # Not len(steps) + 1: the deque stops growing once it is full
+            step_number=steps[-1].step_number + 1 if steps else 1,
             node_name=node_name,
             timestamp=datetime.now(),
-            input_state=self._sanitize_state(input_state),
-            output_state=self._sanitize_state(output_state),
+            input_state=_StateSnapshot(input_state),
+            output_state=_StateSnapshot(output_state),
             duration_ms=duration_ms
         )
-        trace.steps.append(step)
-        logger.debug(f"Added step {step.step_number} ({node_name}) to trace {trace_id}")
+        steps.append(step)
+        logger.debug("Added step %s (%s) to trace %s", step.step_number, node_name, trace_id)
     
     def complete_trace(self, trace_id: str, final_reply: Optional[str] = None,
                       success: bool = True, error: Optional[str] = None):
         """Mark a trace as complete."""
-        if trace_id not in self._traces:
-            logger.warning(f"Trace not found: {trace_id}")
+        trace = self._lookup(trace_id)
+        if trace is None:
+            logger.warning("Trace not found: %s", trace_id)
             return
         
-        trace = self._traces[trace_id]
         trace.completed_at = datetime.now()
-        trace.total_duration_ms = (trace.completed_at - trace.started_at).total_seconds() * 1000
+        trace.total_duration_ms = (perf_counter_ns() - trace._started_ns) / 1e6
         trace.final_reply = final_reply
         trace.success = success
         trace.error = error
-        logger.info(f"Completed trace: {trace_id} (success={success}, steps={len(trace.steps)})")
+        logger.info("Completed trace: %s (success=%s, steps=%s)", trace_id, success, len(trace.steps))
     
     def get_trace(self, trace_id: str) -> Optional[WorkflowTrace]:
-        """Get a trace by ID."""
-        return self._traces.get(trace_id)
+        """
+        Get a trace by ID, with step states sanitized for output.
+        
+        Steps hold raw state snapshots; they are only serialized here,
+        since most traces are never read.
+        """
+        trace = self._lookup(trace_id)
+        if trace is None:
+            return None
+        
+        # The graph may still be appending steps (e.g. /chat/stream runs it
+        # on a worker thread); tuple() copies the deque in one C call, so
+        # iterating the copy can't see it mutate
+        steps_snapshot = tuple(trace.steps)
+        
+        # Unchanged objects (e.g. selected_car) are shared between steps;
+        # dump each one once per read
+        dumped: Dict[int, Any] = {}
+        steps = deque(
+            (
+                replace(
+                    step,
+                    input_state=self._sanitize_state(step.input_state, dumped),
+                    output_state=self._sanitize_state(step.output_state, dumped)
+                )
+                for step in steps_snapshot
+            ),
+            maxlen=MAX_TRACE_STEPS
+        )
+        return trace.model_copy(update={"steps": steps})
+    
+    @staticmethod
+    def _dump(model: BaseModel, dumped: Dict[int, Any]) -> Any:
+        key = id(model)
+        if key not in dumped:
+            dumped[key] = model.model_dump()
+        return dumped[key]
     
-    def _sanitize_state(self, state: Dict[str, Any]) -> Dict[str, Any]:
-        """Sanitize state for storage (remove large objects, convert types)."""
+    def _sanitize_state(self, state: Dict[str, Any] | _StateSnapshot,
+                        dumped: Optional[Dict[int, Any]] = None) -> Dict[str, Any]:
+        """Sanitize state for output (remove large objects, convert types)."""
+        if dumped is None:
+            dumped = {}
         sanitized = {}
         for key, value in state.items():
             # Skip internal fields
             if key.startswith('_'):
                 continue
             
-            # Convert pydantic models to dict
-            if hasattr(value, 'model_dump'):
-                sanitized[key] = value.model_dump()
-            elif isinstance(value, list) and value and hasattr(value[0], 'model_dump'):
-                sanitized[key] = [item.model_dump() for item in value]
-            elif isinstance(value, (str, int, float, bool, type(None))):
+            # Most fields are primitives, so test for those first
+            if isinstance(value, _PRIMITIVES):
                 sanitized[key] = value
-            elif isinstance(value, list):
-                # Limit list length to prevent huge traces
-                sanitized[key] = value[:10] if len(value) > 10 else value
+            elif isinstance(value, BaseModel):
+                # Convert pydantic models to dict
+                sanitized[key] = self._dump(value, dumped)
+            elif isinstance(value, (list, tuple)):
+                if value and isinstance(value[0], BaseModel):
+                    sanitized[key] = [self._dump(item, dumped) for item in value]
+                elif len(value) <= 10 and isinstance(value, list):
+                    # The output is read-only, so short lists are shared
+                    # rather than copied
+                    sanitized[key] = value
+                else:
+                    # Limit list length to prevent huge traces
+                    sanitized[key] = list(islice(value, 10))
             else:
                 sanitized[key] = str(value)
         
         return sanitized
 
 
-# Global trace store instance
-_trace_store: Optional[TraceStore] = None
+# Global trace store instance, created at import so the per-request
+# accessor is a plain lookup
+_trace_store = TraceStore()
 
 
 def get_trace_store() -> TraceStore:
-    """Get or create global trace store."""
+    """Get the global trace store."""
+    return _trace_store
+
+
+def reset_trace_store() -> TraceStore:
+    """Replace the global trace store with a fresh one (for tests)."""
     global _trace_store
-    if _trace_store is None:
-        _trace_store = TraceStore()
+    _trace_store = TraceStore()
     return _trace_store
@@ -4,12 +4,20 @@ Multi-Agent Evolution Diagram Generator
 
 Visualizes the architectural evolution from single-agent to multi-agent system.
 """
+import sys
+
+_RULE = "=" * 80
+
+
+def _header(title: str, first: bool = False) -> None:
+    """Write a section header (rule, title, rule) in one call."""
+    prefix = "" if first else "\n"
+    sys.stdout.write(f"{prefix}{_RULE}\n{title}\n{_RULE}\n")
+
 
 def print_current_architecture():
     """Display current single-agent architecture."""
-    print("="*80)
-    print(" CURRENT ARCHITECTURE: Single-Agent Monolith")
-    print("="*80)
+    _header(" CURRENT ARCHITECTURE: Single-Agent Monolith", first=True)
     print("""
     ┌─────────────────────────────────────────────────────────────────────┐
     │                          USER REQUEST                                │
@@ -59,9 +67,7 @@ def print_current_architecture():
 
 def print_target_architecture():
     """Display target multi-agent architecture."""
-    print("\n" + "="*80)
-    print(" TARGET ARCHITECTURE: Multi-Agent Ecosystem")
-    print("="*80)
+    _header(" TARGET ARCHITECTURE: Multi-Agent Ecosystem")
     print("""
     ┌─────────────────────────────────────────────────────────────────────┐
     │                          USER REQUEST                                │
@@ -151,9 +157,7 @@ def print_target_architecture():
 
 def print_evolution_timeline():
     """Display implementation timeline."""
-    print("\n" + "="*80)
-    print(" EVOLUTION TIMELINE: 7 Phases over 28 Weeks")
-    print("="*80)
+    _header(" EVOLUTION TIMELINE: 7 Phases over 28 Weeks")
     print("""
     Phase 1: FOUNDATION (Weeks 1-4)
     ┌─────────────────────────────────────────────────────────┐
@@ -236,9 +240,7 @@ def print_evolution_timeline():
 
 def print_comparison_table():
     """Display side-by-side comparison."""
-    print("\n" + "="*80)
-    print(" CAPABILITY COMPARISON")
-    print("="*80)
+    _header(" CAPABILITY COMPARISON")
     print("""
     ┌───────────────────────────┬──────────────┬─────────────────────┐
     │ Capability                │   Current    │   Multi-Agent       │
@@ -265,9 +267,7 @@ def print_comparison_table():
 
 def print_agent_communication():
     """Display agent communication patterns."""
-    print("\n" + "="*80)
-    print(" AGENT COMMUNICATION PATTERNS")
-    print("="*80)
+    _header(" AGENT COMMUNICATION PATTERNS")
     print("""
     PATTERN 1: Sequential Delegation
     ═════════════════════════════════
@@ -326,9 +326,7 @@ def print_agent_communication():
 
 def print_maturity_roadmap():
     """Display maturity level progression."""
-    print("\n" + "="*80)
-    print(" MATURITY LEVEL ROADMAP")
-    print("="*80)
+    _header(" MATURITY LEVEL ROADMAP")
     print("""
     
     ⭐ Level 1: Basic Script
@@ -399,9 +397,7 @@ def main():
     
     print_maturity_roadmap()
     
-    print("\n" + "="*80)
-    print(" END OF VISUALIZATION")
-    print("="*80)
+    _header(" END OF VISUALIZATION")
     print("\nFor detailed documentation, see: ARCHITECTURE_ASSESSMENT.md")
     print()
 
@@ -50,4 +50,4 @@ echo ""
 echo "Press Ctrl+C to stop the server"
 echo ""
 
-uvicorn app.api.main:app --reload > backend.log 2>&1
+uvicorn app.api.main:app --reload --loop uvloop --http httptools --no-access-log > backend.log 2>&1
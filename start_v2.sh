@@ -17,4 +17,4 @@ echo "Starting Agent Orchestrator v2.0.0..."
 echo "Multi-agent architecture: Intent Router + Pollution Expert"
 echo ""
 
-python -m uvicorn app.api.main:app --host 0.0.0.0 --port 8001
+python -m uvicorn app.api.main:app --host 0.0.0.0 --port 8001 --loop uvloop --http httptools --no-access-log
@@ -0,0 +1,198 @@
+"""
+Shared fixtures: a deterministic stand-in for the OpenAI-backed LLM client.
+
+By default every LLM call is answered from a recorded cassette or, failing
+that, by FakeLLM. Run with RECORD=1 (and OPENAI_API_KEY) to send calls to
+OpenAI instead and save the responses to the cassette for later runs.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+from unittest.mock import patch
+from pydantic import BaseModel
+
+from app.graph import get_graph
+from app.llm import LLMClient
+from app.models import IntentRequest
+from app.state import get_session_store
+from app.tools import get_policy, list_user_cars
+
+
+# Language of each test message (anything else is English)
+LANGUAGES = {
+    "¿Puedo conducir mi coche diésel en el centro de Madrid?": "es",
+    "Puis-je conduire ma voiture diesel dans le centre de Paris?": "fr",
+    "Kan ik met mijn dieselauto in het centrum van Amsterdam rijden?": "nl",
+    "Darf ich mit meinem Dieselauto in die Berliner Innenstadt fahren?": "de",
+    "Posso guidare la mia auto diesel nel centro di Roma?": "it",
+}
+
+# Slots the real model extracts for each test message
+INTENTS = {
+    "Is EF-456-GH allowed in Amsterdam LEZ?": IntentRequest(
+        intent="single_car", car_identifier="EF-456-GH", city="Amsterdam", zone_phrase="LEZ"),
+    "Is EF-456-GH allowed in Amsterdam?": IntentRequest(
+        intent="single_car", car_identifier="EF-456-GH", city="Amsterdam"),
+    "Can my car AB-123-CD enter Amsterdam?": IntentRequest(
+        intent="single_car", car_identifier="AB-123-CD", city="Amsterdam"),
+    "What about AB-123-CD in Rotterdam?": IntentRequest(
+        intent="single_car", car_identifier="AB-123-CD", city="Rotterdam"),
+    "And for Rotterdam?": IntentRequest(intent="policy_only", city="Rotterdam"),
+    "What about Rotterdam?": IntentRequest(intent="policy_only", city="Rotterdam"),
+    "Rotterdam?": IntentRequest(intent="policy_only", city="Rotterdam"),
+}
+
+
+class FakeLLM:
+    """
+    Drop-in for LLMClient that answers from the tables above.
+    
+    Replies are built from the call arguments, so tests can assert on
+    them without network access, cost or nondeterminism.
+    """
+    
+    def call_detect_language(self, user_message: str) -> str:
+        return LANGUAGES.get(user_message, "en")
+    
+    def call_translate_message(self, message: str, language: str, **fields: str) -> str:
+        text = message.format(**fields) if fields else message
+        return text if language == "en" else f"[{language}] {text}"
+    
+    def call_extract_intent_slots(self, user_message: str) -> IntentRequest:
+        try:
+            return INTENTS[user_message]
+        except KeyError:
+            raise KeyError(f"FakeLLM has no intent for {user_message!r}; add it to conftest.INTENTS")
+    
+    def call_make_disambiguation_question(self, kind, options, language="en", on_token=None) -> str:
+        labels = ", ".join(option["label"] for option in options)
+        return f"Which {kind} do you mean: {labels}?"
+    
+    def call_explain(self, intent, decision=None, fleet_decisions=None, car=None, cars=None,
+                     policy=None, zone=None, language="en", on_token=None) -> str:
+        subject = car.plate if car else intent
+        verdict = decision.allowed if decision else "n/a"
+        reply = f"{subject} in {zone.zone_name if zone else 'unknown zone'}: allowed={verdict}"
+        if on_token:
+            on_token(reply)
+        return reply
+
+
+def pytest_collection_modifyitems(items):
+    """Run every async test on the session event loop (asyncio_mode is auto)."""
+    session_loop = pytest.mark.asyncio(loop_scope="session")
+    for item in items:
+        if pytest_asyncio.is_async_test(item):
+            item.add_marker(session_loop, append=False)
+
+
+CASSETTE_PATH = Path(__file__).parent / "fixtures" / "llm_cassettes" / "llm.json"
+
+
+def _jsonable(value):
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _jsonable(item) for key, item in value.items()}
+    return value
+
+
+class CassetteLLM:
+    """
+    Replays recorded LLM responses, keyed by SHA-256 of method + arguments.
+    
+    Calls missing from the cassette go to ``fallback``; with ``record``
+    set, that is the real client and its responses are added to the
+    cassette (saved by save()).
+    """
+    
+    def __init__(self, fallback, path: Path = CASSETTE_PATH, record: bool = False):
+        self.fallback = fallback
+        self.path = path
+        self.record = record
+        self.entries = json.loads(path.read_text()) if path.exists() else {}
+        self.dirty = False
+    
+    @staticmethod
+    def key(method: str, args, kwargs) -> str:
+        # Streaming callbacks don't change the response
+        kwargs = {name: value for name, value in kwargs.items() if name != "on_token"}
+        payload = json.dumps([method, _jsonable(args), _jsonable(kwargs)], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+    
+    def _call(self, method: str, *args, **kwargs):
+        key = self.key(method, args, kwargs)
+        entry = self.entries.get(key)
+        if entry is None:
+            response = getattr(self.fallback, method)(*args, **kwargs)
+            if not self.record:
+                return response
+            entry = {"method": method, "response": _jsonable(response)}
+            self.entries[key] = entry
+            self.dirty = True
+        elif kwargs.get("on_token"):
+            kwargs["on_token"](entry["response"])
+        
+        if method == "call_extract_intent_slots":
+            return IntentRequest.model_validate(entry["response"])
+        return entry["response"]
+    
+    def save(self) -> None:
+        if self.dirty:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(json.dumps(self.entries, indent=2, sort_keys=True, ensure_ascii=False))
+    
+    def __getattr__(self, method: str):
+        if not method.startswith("call_"):
+            raise AttributeError(method)
+        return lambda *args, **kwargs: self._call(method, *args, **kwargs)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def llm_mock():
+    """Serve every get_llm_client() call from the cassette/FakeLLM, so no test hits OpenAI."""
+    record = os.getenv("RECORD") == "1"
+    llm = CassetteLLM(LLMClient() if record else FakeLLM(), record=record)
+    targets = (
+        "app.llm.get_llm_client",
+        "app.graph.get_llm_client",
+        "app.core.shared.llm.get_llm_client",
+        "app.core.agents.pollution.graph.get_llm_client",
+    )
+    patchers = [patch(target, return_value=llm) for target in targets]
+    for patcher in patchers:
+        patcher.start()
+    yield llm
+    for patcher in patchers:
+        patcher.stop()
+    llm.save()
+
+
+@pytest.fixture(scope="session")
+def graph():
+    """The compiled workflow graph, shared by all tests."""
+    return get_graph()
+
+
+@pytest.fixture(scope="session")
+def session_store():
+    """The process-wide session store."""
+    return get_session_store()
+
+
+@pytest.fixture(scope="session")
+def ams_lez_01_policy():
+    """Policy of the Amsterdam city-center LEZ used by the decision tests."""
+    return get_policy("ams_lez_01")
+
+
+@pytest.fixture(scope="session")
+def user_fleet():
+    """Cars of the "test" user."""
+    return list_user_cars("test")
@@ -14,6 +14,12 @@ if not os.getenv("OPENAI_API_KEY"):
 API_URL = "http://localhost:8000"
 SESSION_ID = f"debug_session_{os.getpid()}"
 
+# One keep-alive connection for all requests
+_session = requests.Session()
+
+# Separators ignored when looking for the plate in a reply
+_PLATE_STRIP = str.maketrans("", "", "- ")
+
 def test_via_api():
     print("="*80)
     print("Testing VIN Context Loss via API")
@@ -24,7 +30,7 @@ def test_via_api():
     print("\n[Request 1] Is EF-456-GH allowed in Amsterdam LEZ?")
     print("-"*80)
     
-    response1 = requests.post(f"{API_URL}/chat", json={
+    response1 = _session.post(f"{API_URL}/chat", json={
         "session_id": SESSION_ID,
         "message": "Is EF-456-GH allowed in Amsterdam LEZ?"
     })
@@ -37,7 +43,7 @@ def test_via_api():
     print("\n[Request 2] And for Rotterdam?")
     print("-"*80)
     
-    response2 = requests.post(f"{API_URL}/chat", json={
+    response2 = _session.post(f"{API_URL}/chat", json={
         "session_id": SESSION_ID,
         "message": "And for Rotterdam?"
     })
@@ -47,7 +53,7 @@ def test_via_api():
     print(f"Reply: {data2['reply'][:100]}...")
     
     # Check if reply mentions EF-456-GH
-    if "EF-456-GH" in data2['reply'] or "EF456GH" in data2['reply'].replace("-", "").replace(" ", ""):
+    if "EF-456-GH" in data2['reply'] or "EF456GH" in data2['reply'].translate(_PLATE_STRIP):
         print("\n✅ SUCCESS: Car context preserved! Reply mentions EF-456-GH")
         return True
     else:
@@ -3,6 +3,7 @@ import pytest
 from unittest.mock import Mock, patch
 from datetime import date
 
+from app.llm import LLMClient
 from app.models import AgentState, IntentRequest, Car, ZoneCandidate, Decision
 from app.graph import (
     extract_intent_node,
@@ -14,11 +15,47 @@ from app.graph import (
 )
 
 
+# Shared inputs, validated once at import (tests only read them)
+AMS_LEZ_ZONE = ZoneCandidate(
+    city="Amsterdam",
+    zone_id="ams_lez_01",
+    zone_name="Amsterdam City Center LEZ",
+    zone_type="LEZ"
+)
+ALLOWED_DECISION = Decision(
+    allowed="true",
+    reason_code="MEETS_REQUIREMENTS",
+    factors=["Vehicle meets requirements"],
+    missing_fields=[],
+    next_actions=[]
+)
+# Car without euro class
+NO_EURO_CLASS_CAR = Car(
+    car_id="incomplete",
+    plate="XX-000-XX",
+    fuel_type="diesel",
+    euro_class=None,  # Missing!
+    vehicle_category="M1"
+)
+NO_DATA_CARS = (
+    Car(car_id="x1", plate="NO-DATA-1", fuel_type="diesel", vehicle_category="M1"),
+    Car(car_id="x2", plate="NO-DATA-2", fuel_type="diesel", vehicle_category="M1"),
+)
+
+
+def _state(**fields) -> AgentState:
+    """Build a node input without validation (the tests pass well-typed fields)."""
+    fields.setdefault("session_id", "test")
+    fields.setdefault("message", "test")
+    return AgentState.model_construct(**fields)
+
+
 @pytest.fixture
 def mock_llm_client():
     """Create a mock LLM client."""
     with patch('app.graph.get_llm_client') as mock:
-        client = Mock()
+        # spec'd, so a call to a method LLMClient doesn't have fails the test
+        client = Mock(spec=LLMClient)
         mock.return_value = client
         yield client
 
@@ -71,11 +108,42 @@ def test_extract_intent_fleet(mock_llm_client):
     assert result.city == "Amsterdam"
 
 
+def test_extract_intent_fast_path_skips_llm(mock_llm_client):
+    """Test that a plate + known city message is classified without the LLM."""
+    from app.graph import get_quick_intent_stats
+    
+    state = AgentState(session_id="test", message="check my plate ab-123-cd in rotterdam")
+    hits_before = get_quick_intent_stats()["hits"]
+    
+    result = extract_intent_node(state)
+    
+    mock_llm_client.call_extract_intent_slots.assert_not_called()
+    assert get_quick_intent_stats()["hits"] == hits_before + 1
+    assert result.intent == "single_car"
+    assert result.car_identifier == "AB-123-CD"
+    assert result.city == "Rotterdam"
+
+
+def test_quick_intent_leaves_ambiguous_messages_to_llm(user_fleet):
+    """Test that the regex fast path only answers unambiguous messages."""
+    from app.tools import quick_intent
+    
+    assert quick_intent("What are the rules in Amsterdam?", user_fleet).intent == "policy_only"
+    assert quick_intent("Are any of my vehicles allowed in Rotterdam?", user_fleet).intent == "fleet"
+    # No known city, two plates, a zone qualifier, or a question about the user's own car
+    assert quick_intent("Is AB-123-CD allowed in Utrecht?", user_fleet) is None
+    assert quick_intent("Is AB-123-CD or EF-456-GH allowed in Amsterdam?", user_fleet) is None
+    assert quick_intent("Can AB-123-CD enter the Amsterdam logistics zone?", user_fleet) is None
+    assert quick_intent("What are the rules for my car in Amsterdam?", user_fleet) is None
+    # Plate-shaped tokens that aren't one of the user's plates: dates, unknown plates
+    assert quick_intent("Can I drive in Amsterdam on 12-01-24?", user_fleet) is None
+    assert quick_intent("Amsterdam rules for 10-12-25 please", user_fleet) is None
+    assert quick_intent("Is 12-AB-34 allowed in Amsterdam?", user_fleet) is None
+
+
 def test_resolve_zone_single_match():
     """Test zone resolution with single match."""
-    state = AgentState(
-        session_id="test",
-        message="test",
+    state = _state(
         city="Rotterdam",
         zone_phrase=None
     )
@@ -91,9 +159,7 @@ def test_resolve_zone_single_match():
 
 def test_resolve_zone_multiple_matches(mock_llm_client):
     """Test zone resolution with multiple matches (disambiguation)."""
-    state = AgentState(
-        session_id="test",
-        message="test",
+    state = _state(
         city="Amsterdam",
         zone_phrase="city center"
     )
@@ -113,9 +179,7 @@ def test_resolve_zone_multiple_matches(mock_llm_client):
 
 def test_resolve_zone_no_city():
     """Test zone resolution without city."""
-    state = AgentState(
-        session_id="test",
-        message="test",
+    state = _state(
         city=None
     )
     
@@ -127,9 +191,7 @@ def test_resolve_zone_no_city():
 
 def test_resolve_car_single_match():
     """Test car resolution with single identifier match."""
-    state = AgentState(
-        session_id="test",
-        message="test",
+    state = _state(
         intent="single_car",
         car_identifier="AB-123-CD"
     )
@@ -143,9 +205,7 @@ def test_resolve_car_single_match():
 
 def test_resolve_car_fleet():
     """Test car resolution for fleet query."""
-    state = AgentState(
-        session_id="test",
-        message="test",
+    state = _state(
         intent="fleet"
     )
     
@@ -157,15 +217,8 @@ def test_resolve_car_fleet():
 
 def test_fetch_policy():
     """Test policy fetching."""
-    state = AgentState(
-        session_id="test",
-        message="test",
-        selected_zone=ZoneCandidate(
-            city="Amsterdam",
-            zone_id="ams_lez_01",
-            zone_name="Amsterdam City Center LEZ",
-            zone_type="LEZ"
-        )
+    state = _state(
+        selected_zone=AMS_LEZ_ZONE
     )
     
     result = fetch_policy_node(state)
@@ -175,70 +228,39 @@ def test_fetch_policy():
     assert result.next_step == "decide"
 
 
-def test_decide_single_car_allowed():
-    """Test decision for single car (allowed)."""
-    from app.tools import get_policy
-    
-    # Electric car should be allowed
-    state = AgentState(
-        session_id="test",
-        message="test",
-        intent="single_car",
-        selected_car=Car(
-            car_id="car_003",
-            plate="IJ-789-KL",
-            fuel_type="electric",
-            euro_class=None,
-            first_reg_date=date(2021, 1, 10),
-            vehicle_category="M1"
-        ),
-        policy=get_policy("ams_lez_01")
-    )
-    
-    result = decide_node(state)
-    
-    assert result.decision is not None
-    assert result.decision.allowed == "true"
-    assert result.next_step == "explain"
+def _m1_car(**fields) -> Car:
+    return Car(car_id="t", plate="XX-000-XX", vehicle_category="M1", **fields)
 
 
-def test_decide_single_car_banned():
-    """Test decision for single car (banned)."""
-    from app.tools import get_policy
-    
-    # Diesel euro4 should be banned in Amsterdam LEZ
-    state = AgentState(
-        session_id="test",
-        message="test",
+@pytest.mark.parametrize("car,expected_allowed", [
+    # Electric cars are always allowed
+    (_m1_car(fuel_type="electric", euro_class=None, first_reg_date=date(2021, 1, 10)), "true"),
+    # Diesel euro4 is banned in the Amsterdam LEZ
+    (_m1_car(fuel_type="diesel", euro_class="euro4", first_reg_date=date(2010, 3, 15)), "false"),
+    (_m1_car(fuel_type="diesel", euro_class="euro6", first_reg_date=date(2018, 1, 1)), "true"),
+    (_m1_car(fuel_type="petrol", euro_class="euro4", first_reg_date=date(2008, 1, 1)), "true"),
+], ids=["electric", "diesel-euro4", "diesel-euro6", "petrol-euro4"])
+def test_decide_single_car(ams_lez_01_policy, car, expected_allowed):
+    """Test decisions for single cars against the Amsterdam LEZ."""
+    state = _state(
         intent="single_car",
-        selected_car=Car(
-            car_id="car_001",
-            plate="AB-123-CD",
-            fuel_type="diesel",
-            euro_class="euro4",
-            first_reg_date=date(2010, 3, 15),
-            vehicle_category="M1"
-        ),
-        policy=get_policy("ams_lez_01")
+        selected_car=car,
+        policy=ams_lez_01_policy
     )
     
     result = decide_node(state)
     
     assert result.decision is not None
-    assert result.decision.allowed == "false"
+    assert result.decision.allowed == expected_allowed
     assert result.next_step == "explain"
 
 
-def test_decide_fleet():
+def test_decide_fleet(user_fleet, ams_lez_01_policy):
     """Test decision for fleet."""
-    from app.tools import list_user_cars, get_policy
-    
-    state = AgentState(
-        session_id="test",
-        message="test",
+    state = _state(
         intent="fleet",
-        cars=list_user_cars("test"),
-        policy=get_policy("ams_lez_01")
+        cars=user_fleet,
+        policy=ams_lez_01_policy
     )
     
     result = decide_node(state)
@@ -254,19 +276,26 @@ def test_decide_fleet():
     assert len(banned) > 0   # Euro4 diesel should be banned
 
 
+def test_decide_fleet_matches_per_car_decisions(user_fleet, ams_lez_01_policy):
+    """Test that deciding once per car profile gives the per-car results."""
+    from app.rules import decide_eligibility, decide_fleet
+    
+    cars = list(user_fleet) * 3 + list(NO_DATA_CARS)
+    policy = ams_lez_01_policy
+    
+    decisions = decide_fleet(cars, policy)
+    
+    assert decisions == [decide_eligibility(car, policy) for car in cars]
+    # Missing-data actions name each car's own plate
+    assert "NO-DATA-1" in decisions[-2].next_actions[0]
+    assert "NO-DATA-2" in decisions[-1].next_actions[0]
+
+
 def test_explain_node(mock_llm_client):
     """Test explanation generation."""
-    state = AgentState(
-        session_id="test",
-        message="test",
+    state = _state(
         intent="single_car",
-        decision=Decision(
-            allowed="true",
-            reason_code="MEETS_REQUIREMENTS",
-            factors=["Vehicle meets requirements"],
-            missing_fields=[],
-            next_actions=[]
-        )
+        decision=ALLOWED_DECISION
     )
     
     mock_llm_client.call_explain.return_value = "Your vehicle is allowed to enter the zone."
@@ -278,23 +307,32 @@ def test_explain_node(mock_llm_client):
     mock_llm_client.call_explain.assert_called_once()
 
 
-def test_missing_fields_decision():
-    """Test decision with missing vehicle fields."""
-    from app.tools import get_policy
+def test_explain_node_streams_to_token_sink(mock_llm_client):
+    """Test that explain_node passes the streaming endpoint's callback to the LLM."""
+    from contextvars import copy_context
+    from app.graph import explain_token_sink
     
-    # Car without euro class
-    state = AgentState(
-        session_id="test",
-        message="test",
+    received = []
+    mock_llm_client.call_explain.return_value = "Allowed."
+    
+    def run():
+        explain_token_sink.set(received.append)
+        return explain_node(_state(intent="single_car"))
+    
+    copy_context().run(run)
+    
+    assert mock_llm_client.call_explain.call_args.kwargs["on_token"] == received.append
+    # Outside the streaming endpoint nothing is streamed
+    explain_node(_state(intent="single_car"))
+    assert mock_llm_client.call_explain.call_args.kwargs["on_token"] is None
+
+
+def test_missing_fields_decision(ams_lez_01_policy):
+    """Test decision with missing vehicle fields."""
+    state = _state(
         intent="single_car",
-        selected_car=Car(
-            car_id="incomplete",
-            plate="XX-000-XX",
-            fuel_type="diesel",
-            euro_class=None,  # Missing!
-            vehicle_category="M1"
-        ),
-        policy=get_policy("ams_lez_01")
+        selected_car=NO_EURO_CLASS_CAR,
+        policy=ams_lez_01_policy
     )
     
     result = decide_node(state)
@@ -0,0 +1,29 @@
+"""Shared fixtures for the agent unit tests."""
+
+import pytest
+from app.core.agents.pollution.agent import PollutionAgent
+from app.core.shared.messaging import AgentMessage
+
+
+@pytest.fixture(scope="module")
+def pollution_agent():
+    """One PollutionAgent (and compiled graph) per test module; tests must not mutate it."""
+    return PollutionAgent()
+
+
+@pytest.fixture
+def make_msg():
+    """Factory for AgentMessages; keyword arguments override the defaults."""
+    def _make(**overrides):
+        fields = dict(
+            trace_id="test-123",
+            correlation_id="corr-123",
+            sender="intent_agent",
+            receiver="pollution_agent",
+            payload={"message": "test query"},
+            conversation_history=[],
+            context={}
+        )
+        fields.update(overrides)
+        return AgentMessage(**fields)
+    return _make
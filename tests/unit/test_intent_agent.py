@@ -1,13 +1,9 @@
 """Unit tests for IntentAgent routing logic."""
 
 import pytest
-from datetime import datetime
 from app.core.agents.intent.agent import IntentAgent
-from app.core.agents.pollution.agent import PollutionAgent
-from app.core.shared.messaging import AgentMessage
 
 
-@pytest.mark.asyncio
 async def test_intent_agent_initialization():
     """Test that intent agent initializes with empty registry."""
     agent = IntentAgent()
@@ -17,11 +13,9 @@ async def test_intent_agent_initialization():
     assert agent.list_agents() == []
 
 
-@pytest.mark.asyncio
-async def test_agent_registration():
+async def test_agent_registration(pollution_agent):
     """Test registering a domain agent."""
     intent_agent = IntentAgent()
-    pollution_agent = PollutionAgent()
     
     intent_agent.register_agent(pollution_agent)
     
@@ -30,11 +24,9 @@ async def test_agent_registration():
     assert intent_agent.list_agents() == ["pollution_agent"]
 
 
-@pytest.mark.asyncio
-async def test_duplicate_registration_raises_error():
+async def test_duplicate_registration_raises_error(pollution_agent):
     """Test that registering the same agent twice raises ValueError."""
     intent_agent = IntentAgent()
-    pollution_agent = PollutionAgent()
     
     intent_agent.register_agent(pollution_agent)
     
@@ -42,11 +34,9 @@ async def test_duplicate_registration_raises_error():
         intent_agent.register_agent(pollution_agent)
 
 
-@pytest.mark.asyncio
-async def test_agent_unregistration():
+async def test_agent_unregistration(pollution_agent):
     """Test unregistering a domain agent."""
     intent_agent = IntentAgent()
-    pollution_agent = PollutionAgent()
     
     intent_agent.register_agent(pollution_agent)
     assert len(intent_agent.agents) == 1
@@ -55,7 +45,6 @@ async def test_agent_unregistration():
     assert len(intent_agent.agents) == 0
 
 
-@pytest.mark.asyncio
 async def test_classify_intent_returns_pollution():
     """Test that intent classification returns pollution_agent for all queries."""
     intent_agent = IntentAgent()
@@ -66,7 +55,6 @@ async def test_classify_intent_returns_pollution():
     assert intent_agent._classify_intent("diesel ban") == "pollution_agent"
 
 
-@pytest.mark.asyncio
 async def test_route_with_no_agents():
     """Test routing when no agents are registered."""
     intent_agent = IntentAgent()
@@ -80,24 +68,13 @@ async def test_route_with_no_agents():
     assert "none" in result.lower()
 
 
-@pytest.mark.asyncio
-async def test_handle_creates_proper_reply():
+async def test_handle_creates_proper_reply(pollution_agent, make_msg):
     """Test that handle method creates proper reply message."""
     intent_agent = IntentAgent()
-    pollution_agent = PollutionAgent()
     intent_agent.register_agent(pollution_agent)
     
     # Create incoming message
-    message = AgentMessage(
-        trace_id="test-123",
-        correlation_id="corr-123",
-        sender="test",
-        receiver="intent_agent",
-        payload={"message": "test query"},
-        conversation_history=[],
-        context={},
-        timestamp=datetime.now()
-    )
+    message = make_msg(sender="test", receiver="intent_agent")
     
     response = await intent_agent.handle(message)
     
@@ -0,0 +1,88 @@
+"""Unit tests for the LLM response cache."""
+
+import pytest
+from unittest.mock import MagicMock
+from app.core.shared.llm import LLMClient
+from app.core.shared.llm_cache import InMemoryCacheBackend, LLMCache
+
+
+def _client_with_reply(text: str) -> LLMClient:
+    """LLMClient whose OpenAI client returns a fixed completion."""
+    client = LLMClient(api_key="sk-test")
+    completion = MagicMock()
+    completion.choices[0].message.content = text
+    client.client = MagicMock()
+    client.client.chat.completions.create.return_value = completion
+    return client
+
+
+def test_low_temperature_calls_are_cached():
+    """Test that identical low-temperature calls hit the API once."""
+    client = _client_with_reply("nl")
+    messages = [{"role": "user", "content": "Mag mijn auto Amsterdam in?"}]
+    
+    assert client._call_llm(messages, "gpt-4o-mini", temperature=0.3) == "nl"
+    assert client._call_llm(messages, "gpt-4o-mini", temperature=0.3) == "nl"
+    
+    client.client.chat.completions.create.assert_called_once()
+    assert client.cache.stats == {"hits": 1, "misses": 1}
+
+
+def test_high_temperature_calls_are_not_cached():
+    """Test that explanation-style calls always go to the API."""
+    client = _client_with_reply("Your car is allowed.")
+    messages = [{"role": "user", "content": "Explain"}]
+    
+    client._call_llm(messages, "gpt-4o-mini", temperature=0.7)
+    client._call_llm(messages, "gpt-4o-mini", temperature=0.7)
+    
+    assert client.client.chat.completions.create.call_count == 2
+    assert client.cache.stats == {"hits": 0, "misses": 0}
+
+
+def test_key_depends_on_model_messages_and_temperature():
+    """Test that cache keys differ when any request field differs."""
+    messages = [{"role": "user", "content": "hi"}]
+    key = LLMCache.key("gpt-4o-mini", messages, 0.3)
+    
+    assert key == LLMCache.key("gpt-4o-mini", [dict(messages[0])], 0.3)
+    assert key != LLMCache.key("gpt-4o", messages, 0.3)
+    assert key != LLMCache.key("gpt-4o-mini", messages, 0.0)
+    assert key != LLMCache.key("gpt-4o-mini", [{"role": "user", "content": "hey"}], 0.3)
+
+
+def test_in_memory_backend_evicts_least_recently_used():
+    """Test LRU eviction once maxsize is exceeded."""
+    backend = InMemoryCacheBackend(maxsize=2)
+    backend.set("a", "1")
+    backend.set("b", "2")
+    backend.get("a")
+    backend.set("c", "3")
+    
+    assert backend.get("a") == "1"
+    assert backend.get("b") is None
+    assert backend.get("c") == "3"
+
+
+def test_in_memory_backend_expires_entries():
+    """Test that entries older than the TTL are treated as misses."""
+    backend = InMemoryCacheBackend(ttl=0)
+    backend.set("a", "1")
+    
+    assert backend.get("a") is None
+    assert len(backend) == 0
+
+
+def test_explanations_are_cached_per_prompt():
+    """Test that identical explain facts reuse the explanation despite temperature 0.7."""
+    client = _client_with_reply("Amsterdam's zone rules apply.")
+    
+    client.call_explain("policy_only", language="en")
+    client.call_explain("policy_only", language="en")
+    client.call_explain("policy_only", language="nl")
+    
+    assert client.client.chat.completions.create.call_count == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,227 @@
+"""Unit tests for LLMClient API-call behaviour (retries, structured outputs)."""
+
+import threading
+import httpx
+import pytest
+from unittest.mock import MagicMock
+from openai import AuthenticationError, BadRequestError, RateLimitError
+from openai.types.completion_usage import CompletionUsage, PromptTokensDetails
+from app.core.shared.llm import LLMClient
+from app.core.shared.models import IntentRequest
+
+
+def _error(cls, status: int, headers: dict):
+    """Build an OpenAI API error with the given status and headers."""
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(status, headers=headers, request=request)
+    return cls("error", response=response, body=None)
+
+
+def _completion(text: str):
+    completion = MagicMock()
+    completion.choices[0].message.content = text
+    return completion
+
+
+def test_rate_limit_error_is_retried():
+    """Test that a 429 (with Retry-After: 0) is retried transparently."""
+    client = LLMClient(api_key="sk-test")
+    client.client = MagicMock()
+    client.client.chat.completions.create.side_effect = [
+        _error(RateLimitError, 429, {"retry-after": "0"}),
+        _completion("en"),
+    ]
+    
+    assert client._call_llm([{"role": "user", "content": "hi"}], "gpt-4o-mini", 0.7) == "en"
+    assert client.client.chat.completions.create.call_count == 2
+
+
+def test_non_transient_error_is_not_retried():
+    """Test that errors such as invalid credentials surface immediately."""
+    client = LLMClient(api_key="sk-test")
+    client.client = MagicMock()
+    client.client.chat.completions.create.side_effect = _error(AuthenticationError, 401, {})
+    
+    with pytest.raises(AuthenticationError):
+        client._call_llm([{"role": "user", "content": "hi"}], "gpt-4o-mini", 0.7)
+    client.client.chat.completions.create.assert_called_once()
+
+
+
+def test_structured_call_uses_native_structured_outputs():
+    """Test that intent extraction makes a single schema-constrained request."""
+    client = LLMClient(api_key="sk-test")
+    client.client = MagicMock()
+    client.client.beta.chat.completions.parse.return_value = _completion(
+        '{"intent": "fleet", "car_identifier": null, "city": "Amsterdam", "zone_phrase": null}'
+    )
+    
+    result = client._structured_call([{"role": "user", "content": "my cars"}], IntentRequest)
+    
+    assert result == IntentRequest(intent="fleet", city="Amsterdam")
+    kwargs = client.client.beta.chat.completions.parse.call_args.kwargs
+    assert kwargs["response_format"] is IntentRequest
+    client.client.chat.completions.create.assert_not_called()
+
+
+def test_structured_call_falls_back_when_schema_rejected():
+    """Test fallback to a plain call + JSON parsing if structured outputs fail."""
+    client = LLMClient(api_key="sk-test")
+    client.client = MagicMock()
+    client.client.beta.chat.completions.parse.side_effect = _error(BadRequestError, 400, {})
+    client.client.chat.completions.create.return_value = _completion(
+        '```json\n{"intent": "policy_only", "car_identifier": null, "city": null, "zone_phrase": null}\n```'
+    )
+    
+    result = client._structured_call([{"role": "user", "content": "rules?"}], IntentRequest)
+    
+    assert result.intent == "policy_only"
+    client.client.chat.completions.create.assert_called_once()
+
+
+
+def test_batch_round_trip():
+    """Test submitting a batch and collecting its successful results."""
+    client = LLMClient(api_key="sk-test")
+    client.client = MagicMock()
+    client.client.files.create.return_value.id = "file-in"
+    client.client.batches.create.return_value.id = "batch-1"
+    client.client.batches.retrieve.return_value = MagicMock(
+        status="completed", output_file_id="file-out"
+    )
+    client.client.files.content.return_value.text = "\n".join([
+        '{"custom_id": "car_001", "response": {"status_code": 200, '
+        '"body": {"choices": [{"message": {"content": " allowed "}}]}}}',
+        '{"custom_id": "car_002", "response": {"status_code": 500, "body": {}}}',
+    ])
+    
+    batch_id = client.submit_batch({
+        "car_001": [{"role": "user", "content": "AB-123-CD?"}],
+        "car_002": [{"role": "user", "content": "EF-456-GH?"}],
+    })
+    
+    assert batch_id == "batch-1"
+    assert client.client.files.create.call_args.kwargs["purpose"] == "batch"
+    assert client.wait_for_batch(batch_id) == {"car_001": "allowed"}
+
+
+
+def test_explain_streams_tokens_to_callback():
+    """Test that call_explain forwards deltas and returns the full text."""
+    client = LLMClient(api_key="sk-test")
+    client.client = MagicMock()
+    chunks = []
+    for delta in ["Your car ", "is allowed", None]:
+        chunk = MagicMock()
+        chunk.choices[0].delta.content = delta
+        chunks.append(chunk)
+    client.client.chat.completions.create.return_value = iter(chunks)
+    received = []
+    
+    reply = client.call_explain(intent="single_car", on_token=received.append)
+    
+    assert reply == "Your car is allowed"
+    assert received == ["Your car ", "is allowed"]
+    assert client.client.chat.completions.create.call_args.kwargs["stream"] is True
+
+
+def test_stream_holds_no_slot_while_retrying():
+    """Test that a throttled stream gives its concurrency slot back during the backoff."""
+    client = LLMClient(api_key="sk-test", max_concurrent=1)
+    client.client = MagicMock()
+    free_during_backoff = []
+    
+    def probe():
+        # Runs while retry sleeps before the second attempt
+        acquired = client._slots.acquire(blocking=False)
+        free_during_backoff.append(acquired)
+        if acquired:
+            client._slots.release()
+    
+    def create(**kwargs):
+        if create.calls == 0:
+            create.calls += 1
+            threading.Timer(0.05, probe).start()
+            raise _error(RateLimitError, 429, {"retry-after": "0.2"})
+        return iter([])
+    create.calls = 0
+    client.client.chat.completions.create.side_effect = create
+    
+    assert client._call_llm_stream([{"role": "user", "content": "hi"}], "gpt-4o-mini", 0.7, print) == ""
+    assert free_during_backoff == [True]
+    # Released again once the stream has been consumed
+    assert client._slots.acquire(blocking=False)
+
+
+def test_language_detection_runs_locally_when_confident():
+    """Test that lingua answers clear-cut messages without an API call."""
+    pytest.importorskip("lingua")
+    client = LLMClient(api_key="sk-test")
+    client.client = MagicMock()
+    
+    assert client.call_detect_language("Kan ik met mijn dieselauto in het centrum van Amsterdam rijden?") == "nl"
+    client.client.chat.completions.create.assert_not_called()
+
+
+@pytest.mark.parametrize("message", [
+    "Is AB-123-CD allowed in Amsterdam LEZ?",
+    "Rotterdam?",
+    "And for Rotterdam?",
+    "ok",
+    "Can my car AB-123-CD enter Amsterdam?",
+    "Which of my cars can enter Amsterdam?",
+])
+def test_english_messages_naming_dutch_cities_are_not_detected_as_dutch(message):
+    """Test that city names and plates don't make lingua answer Dutch for English messages."""
+    pytest.importorskip("lingua")
+    client = LLMClient(api_key="sk-test")
+    client.client = MagicMock()
+    client.client.chat.completions.create.return_value = _completion("en")
+    
+    assert client.call_detect_language(message) == "en"
+
+
+def test_system_messages_are_translated_from_the_table():
+    """Test that known messages skip the LLM and get their fields filled in."""
+    client = LLMClient(api_key="sk-test")
+    client.client = MagicMock()
+    
+    reply = client.call_translate_message(
+        "I couldn't find any pollution zones in {city}. Please check the city name.",
+        "nl",
+        city="Utrecht"
+    )
+    
+    assert reply == "Ik kon geen milieuzones vinden in Utrecht. Controleer de naam van de stad."
+    client.client.chat.completions.create.assert_not_called()
+
+
+def test_llm_translations_are_added_to_the_table():
+    """Test that an unknown message is translated by the LLM only once."""
+    client = LLMClient(api_key="sk-test")
+    client.client = MagicMock()
+    client.client.chat.completions.create.return_value = _completion("Hallo {name}!")
+    
+    assert client.call_translate_message("Hello {name}!", "nl", name="Sam") == "Hallo Sam!"
+    assert client.call_translate_message("Hello {name}!", "nl", name="Kim") == "Hallo Kim!"
+    client.client.chat.completions.create.assert_called_once()
+
+
+def test_prompt_cache_usage_is_recorded():
+    """Test that cached prompt tokens reported by the API are tracked."""
+    client = LLMClient(api_key="sk-test")
+    client.client = MagicMock()
+    completion = _completion("en")
+    completion.usage = CompletionUsage(
+        prompt_tokens=1200, completion_tokens=1, total_tokens=1201,
+        prompt_tokens_details=PromptTokensDetails(cached_tokens=1024)
+    )
+    client.client.chat.completions.create.return_value = completion
+    
+    client._call_llm([{"role": "user", "content": "hi"}], "gpt-4o-mini", 0.7)
+    
+    assert client.prompt_cache_stats == {"prompt_tokens": 1200, "cached_tokens": 1024}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,31 @@
+"""Unit tests for the inter-agent message protocol."""
+
+import pytest
+from app.core.shared.messaging import AgentMessage
+
+
+def test_create_reply_swaps_sender_and_receiver():
+    """Test that a reply keeps the trace and history but swaps direction."""
+    history = ({"role": "user", "content": "hi"},)
+    message = AgentMessage(
+        "trace-1", "corr-1", "intent_agent", "pollution_agent",
+        {"message": "hi"}, {"session": "s1"}, history
+    )
+    
+    reply = message.create_reply({"answer": "ok"})
+    
+    assert (reply.sender, reply.receiver) == ("pollution_agent", "intent_agent")
+    assert (reply.trace_id, reply.correlation_id) == ("trace-1", "corr-1")
+    assert reply.payload == {"answer": "ok"}
+    assert reply.context == {"session": "s1"}
+    assert reply.conversation_history is history
+    assert reply.timestamp >= message.timestamp
+
+
+def test_messages_are_slotted():
+    """Test that messages carry no per-instance __dict__."""
+    message = AgentMessage("t", "c", "a", "b", {})
+    
+    assert not hasattr(message, "__dict__")
+    with pytest.raises(AttributeError):
+        message.extra = 1
@@ -1,22 +1,19 @@
 """Unit tests for PollutionAgent wrapper."""
 
+import asyncio
 import pytest
-from datetime import datetime
 from app.core.agents.pollution.agent import PollutionAgent
-from app.core.shared.messaging import AgentMessage
 
 
-@pytest.mark.asyncio
-async def test_pollution_agent_initialization():
+async def test_pollution_agent_initialization(pollution_agent):
     """Test that pollution agent initializes correctly."""
-    agent = PollutionAgent()
+    agent = pollution_agent
     
     assert agent.name == "pollution_agent"
     assert agent.graph is not None
     assert isinstance(agent.cache, dict)
 
 
-@pytest.mark.asyncio
 async def test_pollution_agent_with_cache():
     """Test pollution agent initialization with custom cache."""
     custom_cache = {"test": "data"}
@@ -25,21 +22,11 @@ async def test_pollution_agent_with_cache():
     assert agent.cache == custom_cache
 
 
-@pytest.mark.asyncio 
-async def test_handle_creates_proper_reply():
+async def test_handle_creates_proper_reply(pollution_agent, make_msg):
     """Test that handle method creates proper reply structure."""
-    agent = PollutionAgent()
+    agent = pollution_agent
     
-    message = AgentMessage(
-        trace_id="test-123",
-        correlation_id="corr-123",
-        sender="intent_agent",
-        receiver="pollution_agent",
-        payload={"message": "test query"},
-        conversation_history=[],
-        context={},
-        timestamp=datetime.now()
-    )
+    message = make_msg(payload={"message": "Rotterdam?"})
     
     response = await agent.handle(message)
     
@@ -48,25 +35,20 @@ async def test_handle_creates_proper_reply():
     assert response.correlation_id == "corr-123"
     assert response.sender == "pollution_agent"
     assert response.receiver == "intent_agent"
-    assert "answer" in response.payload
-    assert isinstance(response.payload["answer"], str)
+    assert "error" not in response.payload
+    assert response.payload["answer"] == "policy_only in Rotterdam Environmental Zone: allowed=n/a"
 
 
-@pytest.mark.asyncio
-async def test_handle_preserves_trace_id():
+async def test_handle_preserves_trace_id(pollution_agent, make_msg):
     """Test that trace_id is preserved through message handling."""
-    agent = PollutionAgent()
+    agent = pollution_agent
     
     trace_id = "unique-trace-456"
-    message = AgentMessage(
+    message = make_msg(
         trace_id=trace_id,
         correlation_id="corr-456",
         sender="test",
-        receiver="pollution_agent",
-        payload={"message": "Is my car allowed?"},
-        conversation_history=[],
-        context={},
-        timestamp=datetime.now()
+        payload={"message": "Is my car allowed?"}
     )
     
     response = await agent.handle(message)
@@ -74,10 +56,35 @@ async def test_handle_preserves_trace_id():
     assert response.trace_id == trace_id
 
 
-@pytest.mark.asyncio
-async def test_repr():
+async def test_concurrent_handles_keep_their_trace_ids(pollution_agent, make_msg):
+    """Test that a batch of concurrent handle() calls each reply to their own message."""
+    cases = [
+        ("trace-a", "Is EF-456-GH allowed in Amsterdam LEZ?",
+         "EF-456-GH in Amsterdam City Center LEZ: allowed=true"),
+        ("trace-b", "What about AB-123-CD in Rotterdam?",
+         "AB-123-CD in Rotterdam Environmental Zone: allowed=true"),
+        ("trace-c", "Rotterdam?",
+         "policy_only in Rotterdam Environmental Zone: allowed=n/a"),
+    ]
+    messages = [
+        make_msg(trace_id=trace_id, correlation_id=f"corr-{trace_id}", payload={"message": text})
+        for trace_id, text, _ in cases
+    ]
+    
+    responses = await asyncio.gather(*(pollution_agent.handle(m) for m in messages))
+    
+    for (trace_id, _, answer), response in zip(cases, responses):
+        assert response.trace_id == trace_id
+        assert response.correlation_id == f"corr-{trace_id}"
+        assert response.sender == "pollution_agent"
+        assert response.receiver == "intent_agent"
+        assert "error" not in response.payload
+        assert response.payload["answer"] == answer
+
+
+async def test_repr(pollution_agent):
     """Test string representation."""
-    agent = PollutionAgent()
+    agent = pollution_agent
     
     repr_str = repr(agent)
     assert "PollutionAgent" in repr_str
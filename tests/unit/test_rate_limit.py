@@ -0,0 +1,74 @@
+"""Unit tests for the OpenAI client-side rate limiter."""
+
+import pytest
+from app.core.shared.rate_limit import TokenBucket, _count_tokens, estimate_tokens
+
+
+class FakeClock:
+    """Manual clock; sleeping advances time instantly."""
+    
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+    
+    def __call__(self) -> float:
+        return self.now
+    
+    def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def test_bucket_allows_burst_up_to_capacity():
+    """Test that a full bucket serves `capacity` requests without waiting."""
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock=clock, sleep=clock.sleep)
+    
+    for _ in range(60):
+        bucket.acquire()
+    
+    assert clock.slept == []
+
+
+def test_bucket_waits_for_refill_when_empty():
+    """Test that an empty bucket blocks for the refill time."""
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock=clock, sleep=clock.sleep)  # 1 token/second
+    bucket.acquire(60)
+    
+    bucket.acquire(2)
+    
+    assert sum(clock.slept) == pytest.approx(2.0)
+
+
+def test_oversized_request_is_capped_at_capacity():
+    """Test that a request larger than the bucket still goes through."""
+    clock = FakeClock()
+    bucket = TokenBucket(10, clock=clock, sleep=clock.sleep)
+    
+    bucket.acquire(1_000)
+    
+    assert clock.slept == []
+
+
+def test_estimate_tokens_grows_with_prompt_length():
+    """Test that longer prompts are estimated as more tokens."""
+    short = estimate_tokens([{"role": "user", "content": "hi"}], "gpt-4o-mini")
+    long = estimate_tokens([{"role": "user", "content": "hi " * 200}], "gpt-4o-mini")
+    
+    assert 0 < short < long
+
+
+def test_repeated_message_bodies_are_tokenized_once():
+    """Test that a shared system prompt is only counted on first use."""
+    _count_tokens.cache_clear()
+    system = {"role": "system", "content": "You are a translation assistant."}
+    
+    estimate_tokens([system, {"role": "user", "content": "hallo"}], "gpt-4o-mini")
+    estimate_tokens([system, {"role": "user", "content": "bonjour"}], "gpt-4o-mini")
+    
+    assert _count_tokens.cache_info().hits == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
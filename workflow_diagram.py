@@ -5,12 +5,10 @@ This module provides a visual representation of the LangGraph workflow.
 Run this script to generate a diagram (requires graphviz).
 """
 
-from app.graph import build_graph
+import sys
 
-
-def print_workflow_ascii():
-    """Print ASCII representation of the workflow."""
-    print("""
+# print() appended the final newline; it is part of the text now
+_DIAGRAM = """
 ╔══════════════════════════════════════════════════════════════════════════════╗
 ║                     AGENT ORCHESTRATOR WORKFLOW                              ║
 ╚══════════════════════════════════════════════════════════════════════════════╝
@@ -186,13 +184,23 @@ AgentState tracks:
 
 Stored in-memory by session_id for PoC.
 Production: Use Redis or database.
-""")
+
+"""
+
+_HINTS = "\n".join((
+    "\n\n",
+    "To visualize the actual LangGraph:",
+    "  1. Install graphviz: brew install graphviz (macOS) or apt-get install graphviz (Linux)",
+    "  2. pip install pygraphviz",
+    "  3. Run: python -c 'from app.graph import build_graph; g = build_graph(); g.get_graph().draw_mermaid()'",
+)) + "\n"
+
+
+def print_workflow_ascii():
+    """Print ASCII representation of the workflow."""
+    sys.stdout.write(_DIAGRAM)
 
 
 if __name__ == "__main__":
     print_workflow_ascii()
-    print("\n\n")
-    print("To visualize the actual LangGraph:")
-    print("  1. Install graphviz: brew install graphviz (macOS) or apt-get install graphviz (Linux)")
-    print("  2. pip install pygraphviz")
-    print("  3. Run: python -c 'from app.graph import build_graph; g = build_graph(); g.get_graph().draw_mermaid()'")
+    sys.stdout.write(_HINTS)